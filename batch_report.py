@@ -0,0 +1,76 @@
+# batch_report.py
+"""Generate dashboard reports without the Streamlit app.
+
+Examples:
+    python batch_report.py --market north=exports/north_2024.xlsx,exports/north_2025.xlsx \
+        --ed 2025-06-30 --ed 2025-03-31 --out reports
+    python batch_report.py --market south=datasets/south.arrow --jobs subjects.csv --format json
+
+A jobs file is a CSV with ``market`` and ``ed`` columns, one row per subject
+property. Each (market, ED) pair is written to ``<out>/<market>_<ED>`` as a
+folder of CSVs or a single JSON file. Records dropped as MLS # conflicts
+while cleaning a market are listed in ``<out>/<market>_conflicts.csv``.
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from clean_utils import DEDUP_RULES, DEFAULT_DEDUP_RULE, STATUS_LABELS
+from report_utils import REPORT_FORMATS, run_batch
+
+
+def parse_market(value):
+    name, sep, files = value.partition('=')
+    if not sep or not name or not files:
+        raise argparse.ArgumentTypeError(f"expected NAME=FILE[,FILE...], got '{value}'")
+    return name, files.split(',')
+
+
+def read_jobs(path, markets):
+    jobs = pd.read_csv(path, dtype={'market': str, 'ed': str})
+    missing = set(jobs['market']) - set(markets)
+    if missing:
+        raise SystemExit(f"❌ Jobs refer to undefined market(s): {', '.join(sorted(missing))}.")
+    return {market: group['ed'].tolist() for market, group in jobs.groupby('market', sort=False)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch Statistics / Yearly / Quarterly / Monthly / listing reports.")
+    parser.add_argument('--market', action='append', type=parse_market, required=True,
+                        help="NAME=FILE[,FILE...] data files (.xlsx or saved .arrow) for one market; repeatable")
+    parser.add_argument('--ed', action='append', default=[], help="Effective date (YYYY-MM-DD) for every market; repeatable")
+    parser.add_argument('--jobs', help="CSV with 'market' and 'ed' columns instead of --ed")
+    parser.add_argument('--out', default='reports', help="Output directory (default: reports)")
+    parser.add_argument('--format', choices=REPORT_FORMATS, default='csv')
+    parser.add_argument('--statuses', nargs='+', choices=STATUS_LABELS, default=STATUS_LABELS)
+    parser.add_argument('--dedup-rule', choices=list(DEDUP_RULES), default=DEFAULT_DEDUP_RULE)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    markets = dict(args.market)
+    if args.jobs:
+        ed_dates = read_jobs(args.jobs, markets)
+    elif args.ed:
+        ed_dates = args.ed
+    else:
+        parser.error("give at least one --ed or a --jobs file")
+
+    failures = 0
+    for market, eds, written, cleaning, error in run_batch(markets, ed_dates, args.out, args.format, args.statuses,
+                                                           args.dedup_rule, args.workers):
+        if error:
+            failures += 1
+            print(error, file=sys.stderr)
+            continue
+        if cleaning and cleaning['removed']:
+            print(f"ℹ️ {market}: {cleaning['removed']} exact duplicate row(s) removed")
+        if cleaning and cleaning['conflicts']:
+            print(f"⚠️ {market}: {cleaning['groups']} MLS # value(s) appear in {cleaning['conflicts']} conflicting records; "
+                  f"{cleaning['dropped']} dropped by the '{args.dedup_rule}' rule (see {cleaning['path']})")
+        print(f"✅ {market}: {len(eds)} ED(s), {len(written)} file(s) written")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmark.py
+"""Time the analytics hot paths on synthetic data and keep a history of results.
+
+Examples:
+    python benchmark.py                         # 1k, 10k, 100k and 1M rows
+    python benchmark.py --rows 10000000 --repeat 1
+    python benchmark.py --fail-on-regression    # non-zero exit if a stage got slower
+
+Every run is appended to the history file (JSON lines). Each stage is compared
+with its latest earlier result at the same row count, and slowdowns beyond
+``--threshold`` are reported as regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from clean_utils import STATUS_LABELS, add_months_since_ed, clean_data, map_statuses
+from ingest_utils import CLEAN_COLUMNS
+from plot_utils import combo_chart, fit_trendline, individual_scatter_chart
+from report_utils import (OPEN_STATUSES, build_cubes, generate_listing_summary, monthly_summary,
+                          quarterly_summary, statistics_summary, yearly_summary)
+from shared_utils import DatasetView
+from synthetic_utils import generate_mls_data
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_HISTORY = "benchmark_history.jsonl"
+BENCH_ED = pd.Timestamp("2025-06-30")
+
+
+def best_time(fn, repeat, setup=None):
+    # Best of ``repeat`` runs; ``setup`` runs untimed before each one
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _scatter_spec(df):
+    fit_trendline.clear()
+    return individual_scatter_chart(df)[0].to_dict()
+
+
+def run_stages(n_rows, repeat, seed=0):
+    """Seconds per stage for one synthetic dataset of ``n_rows`` rows."""
+    raw = generate_mls_data(n_rows, seed=seed).set_axis(CLEAN_COLUMNS, axis=1)
+    df = clean_data(raw.copy())[0]
+    view = DatasetView(df).with_statuses(STATUS_LABELS)
+    all_cube, closed_cube = build_cubes(df)
+    month_start = (BENCH_ED - pd.DateOffset(months=12)).to_period('M').to_timestamp()
+    month_end = BENCH_ED + pd.offsets.MonthEnd(0)
+    open_listings = view.with_statuses(OPEN_STATUSES).frame()
+    yearly = yearly_summary(closed_cube, BENCH_ED)
+    closings = view.window(BENCH_ED - pd.DateOffset(years=5), BENCH_ED).frame()
+
+    stages = {
+        'load_and_clean_data': (lambda frame: clean_data(frame), lambda: (raw.copy(),)),
+        'map_statuses': (lambda: map_statuses(df['Status']), None),
+        'add_months_since_ed': (lambda: add_months_since_ed(df, BENCH_ED), None),
+        'build_cubes': (lambda: build_cubes(df), None),
+        'statistics_summary': (lambda: statistics_summary(all_cube, closed_cube, BENCH_ED), None),
+        'yearly_summary': (lambda: yearly_summary(closed_cube, BENCH_ED), None),
+        'quarterly_summary': (lambda: quarterly_summary(all_cube, BENCH_ED), None),
+        'monthly_summary': (lambda: monthly_summary(view.window(month_start, month_end).frame(), month_start, month_end), None),
+        'generate_listing_summary': (lambda: generate_listing_summary(open_listings, BENCH_ED, closed_cube), None),
+        'combo_chart_spec': (lambda: combo_chart(yearly, 'Period', yearly['Period'].tolist()).to_dict(), None),
+        'scatter_chart_spec': (lambda: _scatter_spec(closings), None),
+    }
+    return {name: best_time(fn, repeat, setup) for name, (fn, setup) in stages.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_regressions(history, records, threshold):
+    # Latest earlier result per (stage, rows), compared with this run
+    previous = {}
+    for record in history:
+        previous[(record['stage'], record['rows'])] = record
+    regressions = []
+    for record in records:
+        before = previous.get((record['stage'], record['rows']))
+        if before and record['seconds'] > before['seconds'] * (1 + threshold):
+            regressions.append((record, before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard analytics on synthetic MLS data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage; the best one is kept")
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown before flagging, e.g. 0.25 = 25%%")
+    parser.add_argument('--no-save', action='store_true', help="Don't append this run to the history")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    run_info = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__
+    }
+    records = []
+    for n_rows in args.rows:
+        print(f"⏱️ {n_rows:,} rows")
+        for stage, seconds in run_stages(n_rows, args.repeat).items():
+            print(f"  {stage:<26} {seconds * 1000:>10.2f} ms")
+            records.append({**run_info, 'rows': n_rows, 'stage': stage, 'seconds': seconds})
+
+    regressions = find_regressions(load_history(args.history), records, args.threshold)
+    for record, before in regressions:
+        print(f"⚠️ {record['stage']} @ {record['rows']:,} rows: {before['seconds'] * 1000:.2f} ms "
+              f"({before.get('commit')}) → {record['seconds'] * 1000:.2f} ms")
+    if not regressions:
+        print("✅ No regressions against the previous run.")
+
+    if not args.no_save:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
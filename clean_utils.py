@@ -0,0 +1,290 @@
+# clean_utils.py
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from window_utils import sort_by_closed_date
+
+# Text dates are parsed with these formats before falling back to inference
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+
+_NULLABLE_INT_TYPES = [
+    (np.iinfo(np.int16), 'Int16'),
+    (np.iinfo(np.int32), 'Int32'),
+    (np.iinfo(np.int64), 'Int64')
+]
+
+
+def parse_dates(col):
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    for date_format in DATE_FORMATS:
+        try:
+            return pd.to_datetime(col, format=date_format)
+        except (ValueError, TypeError):
+            continue
+    return pd.to_datetime(col)
+
+
+def to_compact_numeric(col):
+    # Smallest nullable integer type that holds every value, else nullable float
+    col = pd.to_numeric(col, errors='coerce')
+    values = col.dropna()
+    if values.empty:
+        return col.astype('Int16')
+    if (values % 1 == 0).all():
+        low, high = values.min(), values.max()
+        for info, dtype in _NULLABLE_INT_TYPES:
+            if info.min <= low and high <= info.max:
+                return col.astype(dtype)
+    return col.astype('Float64')
+
+
+def apply_compact_schema(df):
+    """Cast the seven cleaned columns to compact dtypes, in place.
+
+    Dates become datetime64, prices and market time the narrowest nullable
+    numeric type, status codes a categorical and MLS numbers either a compact
+    integer or an Arrow-backed string.
+    """
+    df['Closed_Date'] = parse_dates(df['Closed_Date'])
+    df['Contract_Date'] = parse_dates(df['Contract_Date'])
+
+    df['Sold_Price'] = to_compact_numeric(df['Sold_Price'])
+    df['List_Price'] = to_compact_numeric(df['List_Price'])
+    df['Market_Time'] = to_compact_numeric(df['Market_Time'])
+
+    if pd.api.types.is_numeric_dtype(df['MLS_Number']):
+        df['MLS_Number'] = to_compact_numeric(df['MLS_Number'])
+    else:
+        df['MLS_Number'] = df['MLS_Number'].astype('string[pyarrow]')
+    df['Status'] = df['Status'].astype('category')
+    return df
+
+
+def memory_report(df):
+    usage = df.memory_usage(index=True, deep=True)
+    report = pd.DataFrame({
+        'Dtype': [str(df.index.dtype)] + [str(dtype) for dtype in df.dtypes],
+        'Memory (MB)': usage.values / 1024 ** 2
+    }, index=usage.index)
+    report['Bytes / Row'] = usage.values / max(len(df), 1)
+    return report
+
+
+# How records sharing an MLS_Number (but not identical) are resolved
+DEDUP_RULES = {
+    'latest': "Keep the most advanced status, then the latest activity date",
+    'first': "Keep the first record in upload order",
+    'last': "Keep the last record in upload order",
+    'keep_all': "Keep every record (report only)"
+}
+DEFAULT_DEDUP_RULE = 'latest'
+
+
+def drop_exact_duplicates(df):
+    # One 64-bit hash per row, then a hash-table pass over the integers
+    row_hash = pd.util.hash_pandas_object(df, index=False)
+    return df[~row_hash.duplicated().to_numpy()]
+
+
+def resolve_mls_conflicts(df, rule=DEFAULT_DEDUP_RULE):
+    """Find records sharing an MLS_Number and keep one per group according to ``rule``.
+
+    Returns the resolved frame and a conflict report: every record of every
+    conflicting group, with a ``Kept`` column. Needs Mapped_Status for the
+    'latest' rule.
+    """
+    if rule not in DEDUP_RULES:
+        raise ValueError(f"❌ Unknown deduplication rule: '{rule}'.")
+
+    in_conflict = (df['MLS_Number'].duplicated(keep=False) & df['MLS_Number'].notna()).to_numpy()
+    conflicts = df[in_conflict]
+    keep = np.ones(len(conflicts), dtype=bool)
+
+    if rule == 'first':
+        keep = ~conflicts['MLS_Number'].duplicated(keep='first').to_numpy()
+    elif rule == 'last':
+        keep = ~conflicts['MLS_Number'].duplicated(keep='last').to_numpy()
+    elif rule == 'latest' and len(conflicts):
+        # Status codes follow STATUS_LABELS order, i.e. Active < ... < Closed
+        ranked = pd.DataFrame({
+            'MLS_Number': conflicts['MLS_Number'].to_numpy(),
+            'Rank': conflicts['Mapped_Status'].cat.codes.to_numpy(),
+            'Activity': conflicts[['Closed_Date', 'Contract_Date']].max(axis=1).to_numpy()
+        }).sort_values(['Rank', 'Activity'], kind='stable', na_position='first')
+        winners = ranked.index[~ranked['MLS_Number'].duplicated(keep='last').to_numpy()]
+        keep = np.zeros(len(conflicts), dtype=bool)
+        keep[winners] = True
+
+    report = conflicts.assign(Kept=keep).sort_values('MLS_Number', kind='stable')
+    drop_positions = np.flatnonzero(in_conflict)[~keep]
+    keep_rows = np.ones(len(df), dtype=bool)
+    keep_rows[drop_positions] = False
+    return df[keep_rows], report
+
+
+def clean_data(df, dedup_rule=DEFAULT_DEDUP_RULE):
+    """Compact schema, deduplication and status mapping for a raw frame.
+
+    Returns the cleaned frame sorted by Closed_Date, the number of exact
+    duplicate rows removed and the MLS # conflict report.
+    """
+    # Convert columns to the compact schema (dates, nullable numerics, categoricals)
+    df = apply_compact_schema(df)
+
+    # Remove full-row duplicates (row-hash based, linear time)
+    before_dedup = len(df)
+    df = drop_exact_duplicates(df)
+    removed_count = before_dedup - len(df)
+
+    # Map status values
+    df['Mapped_Status'] = map_statuses(df['Status'])
+
+    # Resolve records that share an MLS # across overlapping exports
+    df, conflicts = resolve_mls_conflicts(df, dedup_rule)
+
+    # Keep rows ordered by Closed_Date so date windows are binary-search slices
+    return sort_by_closed_date(df), removed_count, conflicts
+
+
+def _align_for_concat(base, delta):
+    # Matching dtypes keep categoricals and MLS numbers compact after concat
+    base, delta = base.copy(deep=False), delta.copy(deep=False)
+    if pd.api.types.is_numeric_dtype(base['MLS_Number']) != pd.api.types.is_numeric_dtype(delta['MLS_Number']):
+        base['MLS_Number'] = base['MLS_Number'].astype('string[pyarrow]')
+        delta['MLS_Number'] = delta['MLS_Number'].astype('string[pyarrow]')
+    for col in ['Status', 'Mapped_Status']:
+        if isinstance(base[col].dtype, pd.CategoricalDtype) and isinstance(delta[col].dtype, pd.CategoricalDtype):
+            categories = base[col].cat.categories.union(delta[col].cat.categories, sort=False)
+            base[col] = base[col].cat.set_categories(categories)
+            delta[col] = delta[col].cat.set_categories(categories)
+    return base, delta
+
+
+def merge_by_closed_date(base, delta):
+    """Merge two frames sorted by Closed_Date without sorting them again.
+
+    Each delta row is inserted at its binary-search position in ``base``, so
+    the cost is one searchsorted over the delta plus a single take.
+    """
+    base, delta = _align_for_concat(base, delta)
+    positions = np.searchsorted(base['Closed_Date'].to_numpy(), delta['Closed_Date'].to_numpy(), side='right')
+    order = np.insert(np.arange(len(base)), positions, np.arange(len(base), len(base) + len(delta)))
+    combined = pd.concat([base, delta], ignore_index=True)
+    return combined.take(order).reset_index(drop=True)
+
+
+def upsert_by_mls_number(base, delta):
+    """Apply a newer, already cleaned export on top of a loaded dataset.
+
+    Rows of ``base`` whose MLS_Number appears in ``delta`` are replaced by the
+    delta rows (e.g. a listing that went from Active to Closed), then the delta
+    is merged in Closed_Date order. Returns the merged frame and the replaced
+    base rows.
+    """
+    # Same MLS_Number dtype first: a numeric base never matches string numbers from a mixed export
+    base, delta = _align_for_concat(base, delta)
+    replaced_mask = base['MLS_Number'].isin(delta['MLS_Number']).to_numpy()
+    merged = merge_by_closed_date(base[~replaced_mask], delta)
+    return merged, base[replaced_mask]
+
+
+# Status code → mapped status. Add board-specific codes here, or point
+# DASHBOARD_STATUS_MAPPING at a JSON file with the same {status: [codes]} shape.
+STATUS_MAPPING = {
+    'Active': [
+        'ACTV', 'BOMK', 'NEW', 'RACT', 'PCHG', 'TEMP', 'AUCT',
+        'PRIV-ACTV', 'A', 'PR', 'BOM', 'LCS', 'ACTIVE', 'ACT'
+    ],
+    'Contingent': [
+        'A/I', 'CTGA', 'CTGO', 'HC24', 'HC48', 'HC72',
+        'HS24', 'HS48', 'HS72', 'HS', 'SS', 'PRIV-CTG',
+        'COBU', 'CO3PA', 'COSD', 'COFR', 'COO', 'PRE-MARKET', 'AUC',
+        'FIN'
+    ],
+    'Pending': [
+        'PEND', 'PRIV-PEND', 'P', 'PENDING', 'PND'
+    ],
+    'Closed': [
+        'CLSD', 'S', 'SC', 'SOLD', 'CLOSED'
+    ]
+}
+
+
+def normalize_status_code(status):
+    return str(status).strip().upper()
+
+
+def load_status_mapping(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_status_lookup(mapping):
+    code_to_status = {}
+    for status, codes in mapping.items():
+        for code in codes:
+            code = normalize_status_code(code)
+            if code_to_status.setdefault(code, status) != status:
+                raise ValueError(f"❌ Status code '{code}' is mapped to both '{code_to_status[code]}' and '{status}'.")
+    return code_to_status
+
+
+if os.environ.get('DASHBOARD_STATUS_MAPPING'):
+    STATUS_MAPPING = load_status_mapping(os.environ['DASHBOARD_STATUS_MAPPING'])
+STATUS_LABELS = list(STATUS_MAPPING)
+STATUS_LOOKUP = build_status_lookup(STATUS_MAPPING)
+
+
+def map_statuses(status_col, mapping=None):
+    """Map a column of raw status codes to a categorical of mapped statuses.
+
+    Raw values are factorized once and only the distinct codes go through the
+    lookup, so the cost per row is a single array take. Every unrecognized code
+    is reported together with its row count.
+    """
+    code_to_status = STATUS_LOOKUP if mapping is None else build_status_lookup(mapping)
+    labels = STATUS_LABELS if mapping is None else list(mapping)
+    label_positions = {label: i for i, label in enumerate(labels)}
+
+    codes, uniques = pd.factorize(status_col, use_na_sentinel=False)
+    normalized = [normalize_status_code(value) for value in uniques]
+    positions = np.array([label_positions.get(code_to_status.get(code), -1) for code in normalized], dtype=np.int8)
+
+    unknown = np.flatnonzero(positions < 0)
+    if unknown.size:
+        row_counts = np.bincount(codes, minlength=len(uniques))
+        unknown_counts = {}
+        for i in unknown:
+            unknown_counts[normalized[i]] = unknown_counts.get(normalized[i], 0) + int(row_counts[i])
+        details = ", ".join(
+            f"'{code}' ({count} rows)"
+            for code, count in sorted(unknown_counts.items(), key=lambda item: -item[1])
+        )
+        raise ValueError(f"❌ Unrecognized status codes: {details}. Please check your data.")
+
+    return pd.Categorical.from_codes(positions[codes], categories=labels)
+
+
+def map_status(status):
+    code = normalize_status_code(status)
+    if code not in STATUS_LOOKUP:
+        raise ValueError(f"❌ Unrecognized status: '{code}'. Please check your data.")
+    return STATUS_LOOKUP[code]
+
+def months_since_ed(closed_dates, ed_date):
+    # datetime64[M] counts months since 1970-01, i.e. year * 12 + month up to a constant
+    months = np.asarray(closed_dates).astype('datetime64[M]')
+    ed_month = np.datetime64(pd.Timestamp(ed_date), 'M')
+    missing = np.isnat(months)
+    diff = (ed_month - months).astype(np.int64)
+    diff[missing] = 0
+    return pd.arrays.IntegerArray(diff.astype(np.int32), missing)
+
+
+def add_months_since_ed(df, ed_date):
+    # Derive the column only on frames that are actually displayed; never modifies ``df``
+    return df.assign(Months_Since_ED=months_since_ed(df['Closed_Date'], ed_date))
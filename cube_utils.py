@@ -0,0 +1,270 @@
+# cube_utils.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Upper bound for built cubes kept in memory across sessions
+DEFAULT_CUBE_BYTES = 512 * 1024 * 1024
+
+CUBE_METRICS = {
+    'Median_Price': 'Sold_Price',
+    'Median_Days': 'Market_Time',
+    'Median_List': 'List_Price'
+}
+
+
+class _MonthRuns:
+    """One metric's values sorted within each month, stored back to back."""
+
+    def __init__(self, values, offsets, domain):
+        self.values = values
+        self.offsets = offsets
+        # Candidate values searched when selecting an order statistic
+        self.domain = domain
+
+    @classmethod
+    def build(cls, values, month_idx, n_months):
+        valid = ~np.isnan(values)
+        values, month_idx = values[valid], month_idx[valid]
+        order = np.lexsort((values, month_idx))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(month_idx, minlength=n_months))))
+        return cls(values[order], offsets, np.unique(values))
+
+    @classmethod
+    def from_segments(cls, segments, domain):
+        offsets = np.concatenate(([0], np.cumsum([len(segment) for segment in segments], dtype=np.int64)))
+        values = np.concatenate(segments) if segments else np.zeros(0)
+        return cls(values, offsets, domain)
+
+    def month(self, m):
+        return self.values[self.offsets[m]:self.offsets[m + 1]]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes + self.domain.nbytes
+
+
+def _kth_smallest(runs, k, domain):
+    # Smallest domain value v with more than k run values <= v
+    lo = int(np.searchsorted(domain, min(run[0] for run in runs), side='left'))
+    hi = int(np.searchsorted(domain, max(run[-1] for run in runs), side='left'))
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if sum(int(np.searchsorted(run, domain[mid], side='right')) for run in runs) > k:
+            hi = mid
+        else:
+            lo = mid + 1
+    return domain[lo]
+
+
+def merged_median(runs, domain):
+    """Exact median of the union of several sorted arrays, without merging them."""
+    runs = [run for run in runs if len(run)]
+    n = sum(len(run) for run in runs)
+    if n == 0:
+        return np.nan
+    if n % 2:
+        return float(_kth_smallest(runs, n // 2, domain))
+    return (float(_kth_smallest(runs, n // 2 - 1, domain)) + float(_kth_smallest(runs, n // 2, domain))) / 2
+
+
+class ClosedSalesIndex:
+    """Closed_Date-ordered metric arrays shared by the monthly cubes."""
+
+    summary_columns = ['Median_Price', 'Median_Days', 'Count']
+
+    def _index_rows(self, df):
+        dates = df['Closed_Date'].to_numpy()
+        order = np.argsort(dates, kind='stable')
+        # NaT sorts last, so keep the leading valid part of the ordering
+        order = order[:int((~np.isnat(dates)).sum())]
+        self.dates = dates[order]
+
+        months = self.dates.astype('datetime64[M]')
+        self.first_month = months[0] if len(months) else np.datetime64('1970-01', 'M')
+        month_idx = (months - self.first_month).astype(np.int64)
+        self.n_months = int(month_idx[-1]) + 1 if len(months) else 0
+        # Row position where each month starts, plus the end of the last month
+        self.month_rows = np.searchsorted(self.dates, self._month_start(np.arange(self.n_months + 1)).astype(self.dates.dtype),
+                                          side='left')
+
+        self.raw = {
+            metric: df[col].to_numpy(dtype=float, na_value=np.nan)[order]
+            for metric, col in CUBE_METRICS.items()
+        }
+        return month_idx
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        # Arrays shared by every cube type; subclasses add their aggregates
+        return self.dates.nbytes + self.month_rows.nbytes + sum(values.nbytes for values in self.raw.values())
+
+    def _month_index(self, ts):
+        return int((np.datetime64(ts, 'M') - self.first_month).astype(np.int64))
+
+    def _month_start(self, m):
+        return (self.first_month + m).astype('datetime64[D]')
+
+    def _month_shift(self, other):
+        # Offset that maps month m of ``other`` to the same calendar month here
+        return int((other.first_month - self.first_month).astype(np.int64))
+
+    def _touched_indexes(self, touched_months):
+        return {self._month_index(m) for m in touched_months}
+
+    def _window_rows(self, start, end):
+        """Rows [lo, hi) in the window, and the sub-range [p, q) made of whole months."""
+        start_ts = None if pd.isna(start) else pd.Timestamp(start).normalize()
+        end_ts = None if pd.isna(end) else pd.Timestamp(end).normalize()
+
+        # Keys in the dates' own unit: a mismatched key makes searchsorted cast the whole array
+        unit = self.dates.dtype
+        lo = 0 if start_ts is None else int(np.searchsorted(self.dates, start_ts.to_datetime64().astype(unit), side='left'))
+        hi = len(self.dates) if end_ts is None else int(
+            np.searchsorted(self.dates, (end_ts + pd.Timedelta(days=1)).to_datetime64().astype(unit), side='left'))
+        hi = max(lo, hi)
+
+        first_full = 0 if start_ts is None else self._month_index(start_ts) + (0 if start_ts.day == 1 else 1)
+        last_full = self.n_months - 1 if end_ts is None else self._month_index(end_ts) - (0 if end_ts.is_month_end else 1)
+        first_full, last_full = max(first_full, 0), min(last_full, self.n_months - 1)
+
+        if first_full <= last_full:
+            p = max(lo, int(self.month_rows[first_full]))
+            q = min(hi, int(self.month_rows[last_full + 1]))
+            return lo, hi, p, q, range(first_full, last_full + 1)
+        return lo, hi, hi, hi, range(0)
+
+    def summarize_windows(self, windows, columns=None):
+        """Same output as ``window_utils.summarize_windows``, one cube query per window.
+
+        A missing bound leaves the window open-ended. ``columns`` picks the
+        query results to add (default ``summary_columns``).
+        """
+        stats = [self.query(start, end) for start, end in zip(windows['Start_Date'], windows['End_Date'])]
+        summary = windows.copy()
+        for col in columns or self.summary_columns:
+            summary[col] = [s[col] for s in stats]
+        return summary
+
+
+class MonthlyCube(ClosedSalesIndex):
+    """Per-month sorted price and market-time arrays over closed sales.
+
+    Built once per dataset and status selection. Any date window is answered by
+    combining the sorted arrays of the months it fully covers with the few
+    rows of its partial edge months. Counts, medians and the list-to-sale
+    ratio are exact and never rescan the full dataset.
+    """
+
+    approximate = False
+
+    def __init__(self, df=None):
+        if df is None:
+            return
+        month_idx = self._index_rows(df)
+        self.runs = {
+            metric: _MonthRuns.build(values, month_idx, self.n_months)
+            for metric, values in self.raw.items()
+        }
+
+    @property
+    def nbytes(self):
+        return super().nbytes + sum(runs.nbytes for runs in self.runs.values())
+
+    def patched(self, df, touched_months):
+        """Cube over ``df``, which differs from this cube's rows only in ``touched_months``.
+
+        Months outside ``touched_months`` (datetime64[M] values) reuse their
+        sorted arrays; only the touched months are re-sorted.
+        """
+        cube = MonthlyCube()
+        cube._index_rows(df)
+        shift = cube._month_shift(self)
+        touched = cube._touched_indexes(touched_months)
+
+        cube.runs = {}
+        for metric, runs in self.runs.items():
+            segments, fresh = [], [runs.domain]
+            for m in range(cube.n_months):
+                old_m = m - shift
+                if m not in touched and 0 <= old_m < self.n_months:
+                    segments.append(runs.month(old_m))
+                else:
+                    values = cube.raw[metric][cube.month_rows[m]:cube.month_rows[m + 1]]
+                    segment = np.sort(values[~np.isnan(values)])
+                    segments.append(segment)
+                    fresh.append(segment)
+            # Values that left the data may stay in the domain; selection only returns real values
+            cube.runs[metric] = _MonthRuns.from_segments(segments, np.unique(np.concatenate(fresh)))
+        return cube
+
+    def query(self, start=None, end=None):
+        """Count and medians for closings with ``start <= Closed_Date <= end``.
+
+        Either bound may be None for an open-ended window.
+        """
+        lo, hi, p, q, full_months = self._window_rows(start, end)
+        result = {'Count': hi - lo}
+        for metric, runs in self.runs.items():
+            edge = np.concatenate((self.raw[metric][lo:p], self.raw[metric][q:hi]))
+            edge = np.sort(edge[~np.isnan(edge)])
+            month_runs = [runs.month(m) for m in full_months]
+            result[metric] = merged_median(month_runs + [edge], runs.domain)
+        return result
+
+
+class CubeRegistry:
+    """Process-wide LRU of built cubes keyed by (dataset_id, ...) tuples.
+
+    Cubes are evicted oldest-first once their combined ``nbytes`` exceeds
+    ``max_bytes``. When a dataset is updated incrementally its cubes are
+    carried over to the new dataset id by patching instead of being rebuilt.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CUBE_BYTES):
+        self.max_bytes = max_bytes
+        self._cubes = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._cubes:
+                self._cubes.move_to_end(key)
+                return self._cubes[key][0]
+        cube = build()
+        self.put(key, cube)
+        return cube
+
+    def put(self, key, cube):
+        size = cube.nbytes
+        with self._lock:
+            if key in self._cubes:
+                self._total_bytes -= self._cubes.pop(key)[1]
+            # A single cube larger than the whole budget is never kept
+            if size > self.max_bytes:
+                return
+            self._cubes[key] = (cube, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._cubes.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._cubes)
+
+    def patch_dataset(self, old_dataset_id, new_dataset_id, patch):
+        # patch(key, cube) returns the cube for the same key under the new dataset id
+        with self._lock:
+            items = [(key, cube) for key, (cube, _) in self._cubes.items() if key[0] == old_dataset_id]
+        for key, cube in items:
+            self.put((new_dataset_id,) + key[1:], patch(key, cube))
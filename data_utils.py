@@ -1,30 +1,366 @@
 # data_utils.py
+import functools
+import os
+import uuid
+
+import numpy as np
 import pandas as pd
 import streamlit as st
+from clean_utils import DEDUP_RULES, DEFAULT_DEDUP_RULE, clean_data, add_months_since_ed, months_since_ed
+from ingest_utils import IngestCache, file_digest, get_file_summary, iter_ingest
+from cube_utils import CubeRegistry, MonthlyCube
+from derive_utils import DerivationGraph, LRUCache
+from duckdb_utils import ConnectionRegistry, SQLCube, sql_monthly_summary
+from shared_utils import DatasetView, SharedDatasetStore
+from perf_utils import NULL_RECORDER, StageRecorder
+from report_utils import OPEN_STATUSES, ed_sweep, generate_listing_summary, monthly_summary, quarterly_summary, yearly_summary
+from sketch_utils import SketchCube
+from store_utils import stored_dataset_path
+from window_utils import calendar_bounds, window_bounds
+
+QUERY_BACKENDS = {'pandas': "🐼 Cubes (pandas)", 'duckdb': "🦆 DuckDB (SQL)"}
+
+# Stage timing on by default (e.g. for log scraping), without the sidebar toggle
+DIAGNOSTICS_DEFAULT = os.environ.get('DASHBOARD_DIAGNOSTICS', '') not in ('', '0')
+# Peak memory per stage via tracemalloc, which also slows every stage down
+TRACE_MEMORY_DEFAULT = os.environ.get('DASHBOARD_TRACE_MEMORY', '') not in ('', '0')
+
+
+def start_perf_run():
+    # A fresh recorder per rerun when diagnostics are on, else the shared no-op one
+    if st.session_state.get('diagnostics', DIAGNOSTICS_DEFAULT):
+        session = st.session_state.setdefault('perf_session', uuid.uuid4().hex[:8])
+        st.session_state.perf_runs = st.session_state.get('perf_runs', 0) + 1
+        st.session_state.perf_recorder = StageRecorder(f"{session}-{st.session_state.perf_runs}",
+                                                       trace_memory=st.session_state.get('trace_memory', TRACE_MEMORY_DEFAULT))
+    else:
+        st.session_state.perf_recorder = NULL_RECORDER
+    return st.session_state.perf_recorder
+
+
+def perf_stage(name, rows=None):
+    return st.session_state.get('perf_recorder', NULL_RECORDER).stage(name, rows)
+
+
+def _total_caption(label, total):
+    if not total['trace_memory']:
+        return f"⏱️ {label}: **{total['ms']:,.0f} ms**"
+    # Traced timings run slower than untraced ones, so say which these are
+    return (f"⏱️ {label}: **{total['ms']:,.0f} ms** with memory tracing"
+            + (f", peak **{total['peak_mb']:,.1f} MB**" if 'peak_mb' in total else ""))
+
+
+def perf_fragment(name):
+    """Times the body of an ``st.fragment``.
+
+    Within a full rerun the fragment is one more stage of that rerun. A
+    fragment-only rerun gets its own recorder, since the last full rerun's
+    has already finished, and shows its latency under the fragment.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            recorder = st.session_state.get('perf_recorder', NULL_RECORDER)
+            if recorder.enabled and not recorder.finished:
+                with recorder.stage(f"fragment: {name}"):
+                    return func(*args, **kwargs)
+            if not st.session_state.get('diagnostics', DIAGNOSTICS_DEFAULT):
+                return func(*args, **kwargs)
+
+            recorder = start_perf_run()
+            try:
+                with recorder.stage(f"fragment: {name}"):
+                    result = func(*args, **kwargs)
+            finally:
+                total = recorder.finish(page=st.session_state.get('active_page'), fragment=name)
+            st.caption(_total_caption("Fragment rerun", total))
+            return result
+        return run
+    return decorate
+
+
+def finish_perf_run(panel):
+    recorder = st.session_state.get('perf_recorder', NULL_RECORDER)
+    total = recorder.finish(page=st.session_state.get('active_page'))
+    if total is None or not st.session_state.get('diagnostics', DIAGNOSTICS_DEFAULT):
+        return
+
+    with panel:
+        st.caption(_total_caption("Rerun", total))
+        if recorder.records:
+            # Records are appended as stages finish; start order reads better
+            records = sorted(recorder.records, key=lambda record: record['order'])
+            stages = pd.DataFrame({
+                'Stage': ["· " * record['depth'] + record['stage'] for record in records],
+                'ms': [record['ms'] for record in records],
+                'Rows': [record['rows'] for record in records]
+            })
+            if recorder.trace_memory:
+                stages['Peak MB'] = [record.get('peak_mb') for record in records]
+            st.dataframe(stages.style.format({'ms': '{:,.1f}', 'Peak MB': '{:,.2f}'}, na_rep=''),
+                         hide_index=True, use_container_width=True)
+
+
+@st.cache_resource
+def get_ingest_cache():
+    # One cache per server process, shared by every session
+    return IngestCache()
+
+def uploads_dataset_id(uploaded_files):
+    # Content-based, so the same exports share cached cubes across sessions
+    file_digests = st.session_state.setdefault('file_digests', {})
+    for file in uploaded_files:
+        if file.file_id not in file_digests:
+            file_digests[file.file_id] = file_digest(file.getvalue())
+    return "upload:" + file_digest("".join(file_digests[file.file_id] for file in uploaded_files).encode())
+
+
+def read_uploaded_files(uploaded_files):
+    """Parse and validate uploads, reporting errors and progress in the page.
+
+    Returns one ingest result per file (in upload order) and whether all of
+    them passed the format check.
+    """
+    all_valid = True
+    ingest_cache = get_ingest_cache()
+    file_digests = st.session_state.setdefault('file_digests', {})
+    results = [None] * len(uploaded_files)
+    pending = []
+
+    for i, file in enumerate(uploaded_files):
+        if not file.name.endswith('.xlsx'):
+            st.error(f"❌ `{file.name}` is not an Excel file.")
+            all_valid = False
+            continue
+
+        # Hash each upload once per session; the digest keys the shared cache
+        if file.file_id not in file_digests:
+            file_digests[file.file_id] = file_digest(file.getvalue())
+
+        df_raw = ingest_cache.get(file_digests[file.file_id])
+        if df_raw is not None:
+            results[i] = {'file_name': file.name, 'df': df_raw, 'summary': get_file_summary(df_raw, file.name), 'error': None}
+        else:
+            pending.append(i)
+
+    # ⚙️ Parse cache misses in parallel, one worker process per file
+    if pending:
+        with perf_stage('excel_parse') as stage:
+            progress = st.progress(0.0, text=f"Reading {len(pending)} file(s)...")
+            jobs = [(uploaded_files[i].getvalue(), uploaded_files[i].name) for i in pending]
+            for done, (job_index, result) in enumerate(iter_ingest(jobs), start=1):
+                i = pending[job_index]
+                results[i] = result
+                if result['error']:
+                    st.error(result['error'])
+                else:
+                    ingest_cache.put(file_digests[uploaded_files[i].file_id], result['df'])
+                progress.progress(done / len(pending), text=f"Read {done} of {len(pending)} file(s) (`{result['file_name']}` done)")
+            progress.empty()
+            stage['rows'] = sum(len(results[i]['df']) for i in pending if results[i]['df'] is not None)
+
+    # Results are indexed by upload position, regardless of which worker finished first
+    all_valid = all_valid and all(result is not None and not result['error'] for result in results)
+
+    return results, all_valid
+
+
+@st.cache_resource
+def get_dataset_store():
+    # Every session opening the same dataset id shares one in-memory copy
+    return SharedDatasetStore()
+
+
+def open_dataset(dataset_id, load):
+    # The session keeps only a handle; replacing it releases the previous dataset
+    st.session_state.dataset = get_dataset_store().open(dataset_id, load)
+    # Derived artifacts hold views of the old frame, so they go with it
+    st.session_state.pop('derived_cache', None)
+    return st.session_state.dataset
+
+
+def current_dataset():
+    return st.session_state.dataset.frame
+
+
+@st.cache_resource
+def get_cube_registry():
+    return CubeRegistry()
+
+
+def _cube_rows(view, closed_only):
+    # Materialized only when a cube is actually built
+    return (view.with_statuses(['Closed']) if closed_only else view).frame()
+
+
+def _build_cube(cube_class, view, closed_only, *args):
+    with perf_stage(f"{cube_class.__name__} build", rows=len(view)):
+        return cube_class(_cube_rows(view, closed_only), *args)
 
-def get_file_summary(df, file_name):
-    row_count = len(df)
-    stat_counts = df['Stat'].value_counts().to_dict() if 'Stat' in df.columns else {}
-    return {
-        'file_name': file_name,
-        'row_count': row_count,
-        'stat_counts': stat_counts
-    }
 
-def load_and_clean_data(df):
-    # Convert date columns
-    df['Closed_Date'] = pd.to_datetime(df['Closed_Date'])
-    df['Contract_Date'] = pd.to_datetime(df['Contract_Date'])
+def get_monthly_cube(dataset_id, statuses, closed_only, view):
+    # dataset_id + statuses identify the filtered rows, so they are never hashed
+    return get_cube_registry().get_or_build(
+        (dataset_id, statuses, closed_only, None),
+        lambda: _build_cube(MonthlyCube, view, closed_only)
+    )
+
+
+def get_sketch_cube(dataset_id, statuses, closed_only, relative_accuracy, view):
+    return get_cube_registry().get_or_build(
+        (dataset_id, statuses, closed_only, relative_accuracy),
+        lambda: _build_cube(SketchCube, view, closed_only, relative_accuracy)
+    )
+
+
+def get_window_cube(dataset_id, statuses, accuracy, view, closed_only=False):
+    # Exact monthly cube, or the quantile-sketch cube when an accuracy is given (approximate mode)
+    if accuracy is not None:
+        return get_sketch_cube(dataset_id, statuses, closed_only, accuracy, view)
+    return get_monthly_cube(dataset_id, statuses, closed_only, view)
+
+
+@st.cache_resource
+def get_sql_registry():
+    return ConnectionRegistry()
+
+
+def get_sql_connection(dataset_id, view):
+    # Stored datasets are queried straight from their memory-mapped .arrow file
+    def source():
+        return stored_dataset_path(dataset_id) or view.base
+    return get_sql_registry().get_or_connect(dataset_id, source)
+
+
+def approximate_badge(cube):
+    return (
+        f"<span style='background-color:#fff3cd;color:#8a6d3b;border-radius:6px;padding:2px 8px;font-size:13px'>"
+        f"≈ Approximate (±{cube.relative_accuracy:.1%} relative error)</span>"
+    )
+
+
+# 🧩 cleaned → filtered → ED-adjusted / summaries; each node is rebuilt only when its inputs change
+DERIVATIONS = DerivationGraph(stage=lambda name: perf_stage(f"derive {name}"))
+
+
+@DERIVATIONS.node('cleaned', inputs=('dataset',))
+def _cleaned(dataset):
+    return dataset.view()
+
+
+@DERIVATIONS.node('filtered', inputs=('statuses',), parents=('cleaned',))
+def _filtered(cleaned, statuses):
+    return cleaned.with_statuses(statuses)
+
+
+@DERIVATIONS.node('sql', inputs=('dataset', 'backend'), parents=('cleaned',))
+def _sql(cleaned, dataset, backend):
+    # Shared DuckDB database over the dataset, only for the SQL backend. Kept as a
+    # lookup, not the connection, so a connection evicted from the registry is reopened
+    if backend != 'duckdb':
+        return None
+    dataset_id = dataset.dataset_id
+    return lambda: get_sql_connection(dataset_id, cleaned)
+
+
+@DERIVATIONS.node('all_cube', inputs=('dataset', 'statuses', 'accuracy'), parents=('filtered', 'sql'))
+def _all_cube(filtered, sql, dataset, statuses, accuracy):
+    if sql is not None:
+        return SQLCube(sql, statuses)
+    return get_window_cube(dataset.dataset_id, statuses, accuracy, filtered)
+
+
+@DERIVATIONS.node('closed_cube', inputs=('dataset', 'statuses', 'accuracy'), parents=('filtered', 'sql'))
+def _closed_cube(filtered, sql, dataset, statuses, accuracy):
+    if sql is not None:
+        return SQLCube(sql, statuses, closed_only=True)
+    return get_window_cube(dataset.dataset_id, statuses, accuracy, filtered, closed_only=True)
+
+
+@DERIVATIONS.node('head', inputs=('ed',), parents=('filtered',))
+def _head(filtered, ed):
+    return add_months_since_ed(filtered.head(5), ed)
+
+
+@DERIVATIONS.node('missing', parents=('filtered',))
+def _missing(filtered):
+    # Column NA counts plus the rows having any missing value, kept as a view
+    df = filtered.frame()
+    na_rows = df.isna().any(axis=1).to_numpy()
+    na_counts = df.isna().sum()
+    return na_counts[na_counts > 0], DatasetView(filtered.base, filtered.rows[na_rows])
+
 
-    # Convert List_Price & Sold_Price to numeric
-    df['Sold_Price'] = pd.to_numeric(df['Sold_Price'], errors='coerce')
-    df['List_Price'] = pd.to_numeric(df['List_Price'], errors='coerce')
+@DERIVATIONS.node('missing_months', inputs=('ed',), parents=('missing',))
+def _missing_months(missing, ed):
+    # Only the Months_Since_ED column is kept per ED, not a copy of the rows
+    return months_since_ed(missing[1].frame(['Closed_Date'])['Closed_Date'], ed)
 
-    # Remove full-row duplicates
-    before_dedup = len(df)
-    df = df.drop_duplicates()
-    after_dedup = len(df)
-    removed_count = before_dedup - after_dedup
+
+@DERIVATIONS.node('statistics', inputs=('ed',), parents=('all_cube', 'closed_cube'))
+def _statistics(all_cube, closed_cube, ed):
+    windows = window_bounds(ed, 'yearly', 5).frame(labels=False)
+    return all_cube.summarize_windows(windows), closed_cube.summarize_windows(windows)
+
+
+@DERIVATIONS.node('listing_summary', inputs=('ed',), parents=('filtered', 'closed_cube'))
+def _listing_summary(filtered, closed_cube, ed):
+    # Closings come from the cube, so only open listings are materialized
+    return generate_listing_summary(filtered.with_statuses(OPEN_STATUSES).frame(), ed, closed_cube)
+
+
+@DERIVATIONS.node('yearly', inputs=('ed',), parents=('closed_cube',))
+def _yearly(closed_cube, ed):
+    return yearly_summary(closed_cube, ed)
+
+
+@DERIVATIONS.node('quarterly', inputs=('ed',), parents=('all_cube',))
+def _quarterly(all_cube, ed):
+    return quarterly_summary(all_cube, ed)
+
+
+@DERIVATIONS.node('window', inputs=('date_range',), parents=('filtered',))
+def _window(filtered, date_range):
+    return filtered.window(*date_range)
+
+
+@DERIVATIONS.node('monthly', inputs=('date_range', 'statuses'), parents=('window', 'sql'))
+def _monthly(window, sql, date_range, statuses):
+    if sql is not None:
+        return sql_monthly_summary(sql, *date_range, statuses)
+    return monthly_summary(window.frame(), *date_range)
+
+
+@DERIVATIONS.node('ed_sweep', inputs=('eds',), parents=('filtered', 'all_cube', 'closed_cube'))
+def _ed_sweep(filtered, all_cube, closed_cube, eds):
+    return ed_sweep(filtered, eds, all_cube, closed_cube)
+
+
+def derived(name, **inputs):
+    """Artifact ``name`` for this session's dataset, ED, statuses, medians mode and backend.
+
+    Extra inputs (e.g. ``date_range``) are passed as keywords. Results are kept in a
+    per-session LRU, so revisiting a page or an earlier ED reuses them.
+    """
+    cache = st.session_state.get('derived_cache')
+    if cache is None:
+        cache = st.session_state.derived_cache = LRUCache(max_entries=48)
+    backend = st.session_state.get('query_backend', 'pandas')
+    approximate = backend == 'pandas' and st.session_state.get('approx_mode', False)
+    context = {
+        'dataset': st.session_state.dataset,
+        'statuses': st.session_state.get('selected_statuses'),
+        'ed': pd.Timestamp(st.session_state.ed_date),
+        'accuracy': st.session_state.approx_error / 100 if approximate else None,
+        'backend': backend,
+        **inputs
+    }
+    return DERIVATIONS.evaluate(name, cache, **context)
+
+
+def load_and_clean_data(df, dedup_rule=DEFAULT_DEDUP_RULE):
+    with perf_stage('clean', rows=len(df)):
+        df, removed_count, conflicts = clean_data(df, dedup_rule)
 
     # Show deduplication result
     if removed_count > 0:
@@ -32,49 +368,27 @@ def load_and_clean_data(df):
     else:
         st.success("✅ No duplicate rows found.")
 
-    # Map status values
-    df['Mapped_Status'] = df['Status'].apply(map_status)
+    if not conflicts.empty:
+        n_groups = conflicts['MLS_Number'].nunique()
+        st.warning(f"⚠️ {n_groups} MLS # value(s) appear in {len(conflicts)} conflicting records. "
+                   f"Rule applied: {DEDUP_RULES[dedup_rule]}.")
+        with st.expander("🔎 MLS # Conflict Report"):
+            st.dataframe(conflicts, use_container_width=True)
 
     return df
 
 
-def map_status(status):
-    status = str(status).strip().upper()
-
-    active_status = [
-        'ACTV', 'BOMK', 'NEW', 'RACT', 'PCHG', 'TEMP', 'AUCT',
-        'PRIV-ACTV', 'A', 'PR', 'BOM', 'LCS', 'ACTIVE', 'ACT'
-    ]
-
-    contingent_status = [
-        'A/I', 'CTGA', 'CTGO', 'HC24', 'HC48', 'HC72',
-        'HS24', 'HS48', 'HS72', 'HS', 'SS', 'PRIV-CTG',
-        'COBU', 'CO3PA', 'COSD', 'COFR', 'COO', 'PRE-MARKET', 'AUC',
-        'FIN'
-    ]
-
-    pending_status = [
-        'PEND', 'PRIV-PEND', 'P', 'PENDING', 'PND'
-    ]
-
-    sold_status = [
-        'CLSD', 'S', 'SC', 'SOLD','CLOSED'
-    ]
-
-    if status in active_status:
-        return "Active"
-    elif status in contingent_status:
-        return "Contingent"
-    elif status in pending_status:
-        return "Pending"
-    elif status in sold_status:
-        return "Closed"
-    else:
-        raise ValueError(f"❌ Unrecognized status: '{status}'. Please check your data.")
+def patch_cubes(old_dataset_id, new_dataset_id, df_new, replaced, delta):
+    # Re-aggregate only the months whose rows were replaced or added
+    dates = np.concatenate([replaced['Closed_Date'].to_numpy(), delta['Closed_Date'].to_numpy()])
+    touched_months = np.unique(dates[~np.isnat(dates)].astype('datetime64[M]'))
 
-def add_months_since_ed(df, ed_date):
-    df['Months_Since_ED'] = (pd.to_datetime(ed_date).to_period('M') - df['Closed_Date'].dt.to_period('M')).apply(lambda x: x.n if pd.notnull(x) else None)
-    return df
+    def patch(key, cube):
+        _, statuses, closed_only, _ = key
+        rows = _cube_rows(DatasetView(df_new).with_statuses(statuses), closed_only)
+        return cube.patched(rows, touched_months)
+
+    get_cube_registry().patch_dataset(old_dataset_id, new_dataset_id, patch)
 
 
 def get_date_range_input():
@@ -96,13 +410,11 @@ def get_date_range_input():
     return start_ed, end_ed
 
 def get_month_range_input():
-    month_range = pd.period_range(
-        start=st.session_state.ed_date - pd.DateOffset(years=5),
-        end=st.session_state.ed_date,
-        freq='M'
-    ).to_timestamp()
+    # Whole calendar months from five years before the ED through the ED's month
+    ed = pd.Timestamp(st.session_state.ed_date)
+    months = calendar_bounds((ed - pd.DateOffset(years=5)).replace(day=1), ed + pd.offsets.MonthEnd(0), 'monthly')
 
-    month_options = month_range.strftime("%Y-%m").tolist()
+    month_options = months.labels.tolist()
     total_months = len(month_options)
 
     # Default range: last 12 months
@@ -114,8 +426,8 @@ def get_month_range_input():
     start_month = st.selectbox("Select Start Month", options=month_options, index=default_start_index)
     end_month = st.selectbox("Select End Month", options=month_options, index=total_months - 1)
 
-    start_ed = pd.to_datetime(start_month)
-    end_ed = pd.to_datetime(end_month) + pd.offsets.MonthEnd(0)
+    start_ed = pd.Timestamp(months.starts[month_options.index(start_month)])
+    end_ed = pd.Timestamp(months.ends[month_options.index(end_month)])
 
     if start_ed > end_ed:
         st.warning("⚠️ Start month must be before or equal to end month.")
@@ -126,7 +438,8 @@ def get_month_range_input():
 
 def get_year_range_input():
     current_year = st.session_state.ed_date.year
-    year_range = list(range(current_year - 5, current_year + 1))
+    years = calendar_bounds(f"{current_year - 5}-01-01", f"{current_year}-12-31", 'yearly')
+    year_range = [int(label) for label in years.labels]
 
     start_year = st.selectbox("Select Start Year", options=year_range, index=0)
     end_year = st.selectbox("Select End Year", options=year_range, index=len(year_range) - 1)
@@ -135,65 +448,41 @@ def get_year_range_input():
         st.warning("⚠️ Start year must be before or equal to end year.")
         st.stop()
 
-    start_ed = pd.to_datetime(f"{start_year}-01-01")
-    end_ed = pd.to_datetime(f"{end_year}-12-31")
+    start_ed = pd.Timestamp(years.starts[year_range.index(start_year)])
+    end_ed = pd.Timestamp(years.ends[year_range.index(end_year)])
 
     return start_ed, end_ed
 
-def generate_12_month_summary(df):
-    closed_sales = df[df['Mapped_Status'] == 'Closed']
-    median_time = int(closed_sales['Market_Time'].median()) if not closed_sales.empty else 0
-    median_price = int(closed_sales['Sold_Price'].median()) if not closed_sales.empty else 0
-    closed_count = closed_sales.shape[0]
-
-    summary = (
-        f"<span style='color:red; font-weight:bold'>{closed_count}</span> closed sales with a median market time of "
-        f"<span style='color:red; font-weight:bold'>{median_time}</span> days and median sales price of "
-        f"<span style='color:red; font-weight:bold'>${median_price:,.0f}</span>."
-    )
-    return summary
-
-def generate_listing_summary(df_all, ed_date):
-    one_year_ago = pd.Timestamp(ed_date) - pd.DateOffset(months=12)
-
-    # Count all active listings (no date filtering)
-    active_count = df_all[df_all['Mapped_Status'] == 'Active'].shape[0]
-
-    recent_df = df_all[df_all['Contract_Date'] >= one_year_ago]
-    cont_pend_count = recent_df[recent_df['Mapped_Status'].isin(['Contingent', 'Pending'])].shape[0]
-    closed_df = df_all[
-        (df_all['Mapped_Status'] == 'Closed') &
-        (df_all['Closed_Date'] >= one_year_ago)
-    ]
-
-    closed_count = closed_df.shape[0]
-
-    months = 12
-    absorption_rate = closed_count / months if months > 0 else 0
-    absorption_period = active_count / absorption_rate if absorption_rate > 0 else float('inf')
-
-    # 🧮 Compute List/Sold Price Median and Ratio
-    median_list = closed_df['List_Price'].median()
-    median_sold = closed_df['Sold_Price'].median()
-    ratio = (median_sold / median_list) * 100 if median_list else 0
-
-    # Create message (with ratio directly appended)
-    listing_summary = (
-        f"There are currently <span style='color:red; font-weight:bold'>{active_count}</span> active listings and "
-        f"<span style='color:red; font-weight:bold'>{cont_pend_count}</span> contingent/pending listings in the search parameter defined above.  \n"
-        f"🧮 Absorption Rate is <span style='color:red; font-weight:bold'>{absorption_rate:.2f}</span> /month, and the current inventory would be absorbed in "
-        f"<span style='color:red; font-weight:bold'>{absorption_period:.2f} months</span>.  \n"
-        f"The median list price was <span style='color:red; font-weight:bold'>&#36;{median_list:,.0f}</span> and "
-        f"the median sales price was <span style='color:red; font-weight:bold'>&#36;{median_sold:,.0f}</span>, resulting in a "
-        f"median list-to-sale price ratio of <span style='color:red; font-weight:bold'>{ratio:.2f}%</span>."
-    )
-
-    return listing_summary
-
-
-
-
-
 
+MAX_SWEEP_EDS = 120
+SWEEP_FREQUENCIES = {"Month ends": 'ME', "Quarter ends": 'QE', "Year ends": 'YE'}
 
 
+def get_ed_sweep_input():
+    """EDs for the sweep, from a date range and step or from a typed list."""
+    mode = st.radio("Effective dates", ["Range", "List"], horizontal=True)
+    if mode == "Range":
+        col1, col2, col3 = st.columns(3)
+        start = col1.date_input("First ED", value=st.session_state.ed_date - pd.DateOffset(years=2))
+        end = col2.date_input("Last ED", value=st.session_state.ed_date)
+        step = col3.selectbox("Step", list(SWEEP_FREQUENCIES))
+        if start > end:
+            st.warning("⚠️ First ED must be before or equal to last ED.")
+            st.stop()
+        eds = pd.date_range(start, end, freq=SWEEP_FREQUENCIES[step])
+    else:
+        text = st.text_input("EDs (YYYY-MM-DD, comma separated)", value=st.session_state.ed_date.strftime('%Y-%m-%d'))
+        try:
+            eds = pd.DatetimeIndex([pd.Timestamp(value.strip()) for value in text.split(',') if value.strip()])
+        except ValueError:
+            st.error("❌ Could not read the dates. Use YYYY-MM-DD, separated by commas.")
+            st.stop()
+
+    eds = eds.normalize().unique().sort_values()
+    if eds.empty:
+        st.warning("⚠️ No effective dates in the selection.")
+        st.stop()
+    if len(eds) > MAX_SWEEP_EDS:
+        st.warning(f"⚠️ {len(eds)} EDs selected; only the last {MAX_SWEEP_EDS} are compared.")
+        eds = eds[-MAX_SWEEP_EDS:]
+    return tuple(eds)
@@ -0,0 +1,87 @@
+# derive_utils.py
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+
+def input_key(value):
+    # Objects such as dataset handles are keyed by their version, not by identity
+    return getattr(value, 'cache_key', value)
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map with a fixed number of entries."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DerivationGraph:
+    """Artifacts derived from one another, each memoized by the inputs it depends on.
+
+    A node declares the inputs it reads (e.g. dataset, ED, statuses, range) and
+    the nodes it is computed from. Its cache key is its name plus the values of
+    its own inputs and of every input upstream of it, so an artifact is reused
+    as long as none of them changed, e.g. when returning to an earlier ED.
+    """
+
+    def __init__(self, stage=None):
+        self._nodes = {}
+        self._inputs = {}
+        # stage(name) wraps each actual computation, e.g. for timing
+        self._stage = stage or (lambda name: nullcontext())
+
+    def node(self, name, inputs=(), parents=()):
+        """Register ``compute(*parent_values, **inputs)`` as node ``name``."""
+        def register(compute):
+            missing = [parent for parent in parents if parent not in self._nodes]
+            if missing:
+                raise ValueError(f"❌ Node '{name}' depends on unknown node(s): {', '.join(missing)}.")
+            upstream = set(inputs).union(*(self._inputs[parent] for parent in parents))
+            self._nodes[name] = (tuple(inputs), tuple(parents), compute)
+            self._inputs[name] = tuple(sorted(upstream))
+            return compute
+        return register
+
+    def inputs(self, name):
+        # Every input the node depends on, directly or through its parents
+        return self._inputs[name]
+
+    def key(self, name, context):
+        return (name,) + tuple(input_key(context[input_name]) for input_name in self._inputs[name])
+
+    def evaluate(self, name, cache, **context):
+        """Value of node ``name`` for the inputs in ``context``, computing only what ``cache`` lacks."""
+        inputs, parents, compute = self._nodes[name]
+
+        def build():
+            parent_values = [self.evaluate(parent, cache, **context) for parent in parents]
+            with self._stage(name):
+                return compute(*parent_values, **{input_name: context[input_name] for input_name in inputs})
+
+        return cache.get_or_build(self.key(name, context), build)
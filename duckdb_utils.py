@@ -0,0 +1,276 @@
+# duckdb_utils.py
+"""Optional DuckDB backend for the Statistics, Yearly, Quarterly and Monthly summaries.
+
+The summaries run as SQL in an embedded, in-process DuckDB database, which
+aggregates on all cores and can spill to disk. ``SQLCube`` answers the same
+window queries as the pandas cubes, so the ``report_utils`` summary builders
+and the charts work on either backend unchanged.
+
+Check that both backends agree on a dataset:
+    python duckdb_utils.py datasets/north.arrow --ed 2025-06-30 --ed 2024-12-31
+"""
+import argparse
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from clean_utils import STATUS_LABELS
+from report_utils import (build_cubes, load_market, monthly_summary, quarterly_summary, report_month_range,
+                          statistics_summary, yearly_summary)
+from shared_utils import DatasetView
+from store_utils import DATASET_SUFFIX
+from window_utils import calendar_bounds
+
+try:
+    import duckdb
+except ImportError:  # optional: pip install duckdb
+    duckdb = None
+
+DUCKDB_AVAILABLE = duckdb is not None
+SALES_COLUMNS = ['Closed_Date', 'Sold_Price', 'Market_Time', 'List_Price', 'Mapped_Status']
+PARITY_SECTIONS = ('statistics', 'yearly', 'quarterly', 'monthly')
+
+_STATUS_FILTER = "list_contains($statuses, Mapped_Status::VARCHAR)"
+
+_WINDOWS_SQL = f"""
+SELECT w.Window,
+       count(s.Closed_Date) AS Count,
+       median(s.Sold_Price) AS Median_Price,
+       median(s.Market_Time) AS Median_Days,
+       median(s.List_Price) AS Median_List
+FROM (SELECT unnest($windows) AS Window, unnest($starts) AS Start_Date, unnest($ends) AS End_Date) AS w
+LEFT JOIN (SELECT * FROM sales WHERE {_STATUS_FILTER}) AS s
+    -- A missing bound leaves the window open-ended
+    ON s.Closed_Date BETWEEN coalesce(w.Start_Date, '-infinity'::TIMESTAMP) AND coalesce(w.End_Date, 'infinity'::TIMESTAMP)
+GROUP BY w.Window
+"""
+
+_MONTHLY_SQL = f"""
+SELECT strftime(date_trunc('month', Closed_Date), '%Y-%m') AS Closed_Month,
+       median(Sold_Price) AS Median_Price,
+       median(Market_Time) AS Median_Days,
+       count(Sold_Price) AS Count
+FROM sales
+WHERE {_STATUS_FILTER} AND Closed_Date BETWEEN $start AND $end
+GROUP BY Closed_Month
+"""
+
+
+def require_duckdb():
+    if duckdb is None:
+        raise ImportError("❌ The DuckDB backend needs the duckdb package (pip install duckdb).")
+
+
+def _to_param(value):
+    return None if pd.isna(value) else pd.Timestamp(value).to_pydatetime()
+
+
+def _sales_table(source):
+    # Saved datasets are memory-mapped, so the columns are paged in by DuckDB's scans
+    if isinstance(source, str):
+        with pa.memory_map(source, 'r') as mapped:
+            return pa.ipc.open_file(mapped).read_all().select(SALES_COLUMNS)
+    return pa.Table.from_pandas(source[SALES_COLUMNS], preserve_index=False)
+
+
+def _query_df(con, sql, params):
+    # ``con`` may be a function returning the connection, e.g. from a ConnectionRegistry
+    con = con() if callable(con) else con
+    if isinstance(con, SharedConnection):
+        return con.query_df(sql, params)
+    return con.execute(sql, params).df()
+
+
+def connect(source, threads=None, memory_limit=None, temp_directory=None):
+    """In-process DuckDB database exposing the dataset as the ``sales`` table.
+
+    ``source`` is a cleaned DataFrame or the path of a saved .arrow dataset.
+    ``memory_limit`` (e.g. '4GB') and ``temp_directory`` bound the memory used
+    by aggregations, which spill to disk beyond it.
+    """
+    require_duckdb()
+    con = duckdb.connect(':memory:')
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit:
+        con.execute("SET memory_limit = $limit", {'limit': memory_limit})
+    if temp_directory:
+        con.execute("SET temp_directory = $path", {'path': temp_directory})
+    con.register('sales', _sales_table(source))
+    return con
+
+
+class SharedConnection:
+    """A DuckDB connection used by several sessions, one query at a time.
+
+    The dataset is a registered Arrow table, which cursors can't see, so
+    queries are serialized instead; each one still runs on all cores.
+    """
+
+    def __init__(self, con):
+        self.con = con
+        self._lock = threading.Lock()
+
+    def query_df(self, sql, params):
+        with self._lock:
+            return self.con.execute(sql, params).df()
+
+    def close(self):
+        with self._lock:
+            self.con.close()
+
+
+class ConnectionRegistry:
+    """Process-wide DuckDB connections, one per dataset id, least recently used closed first.
+
+    Sessions on the same dataset share its connection, so the data is
+    registered (and, for a frame, converted to Arrow) once. Callers should
+    keep ``lambda: registry.get_or_connect(...)`` rather than the connection,
+    so that one closed on eviction is reopened on the next query.
+    """
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._connections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_connect(self, dataset_id, source):
+        """Connection for ``dataset_id``, calling ``source()`` (a path or frame) only to open a new one."""
+        with self._lock:
+            if dataset_id in self._connections:
+                self._connections.move_to_end(dataset_id)
+                return self._connections[dataset_id]
+        con = SharedConnection(connect(source()))
+        with self._lock:
+            con = self._connections.setdefault(dataset_id, con)
+            self._connections.move_to_end(dataset_id)
+            evicted = []
+            while len(self._connections) > self.max_entries:
+                evicted.append(self._connections.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return con
+
+    def __len__(self):
+        return len(self._connections)
+
+
+class SQLCube:
+    """Window counts and medians answered by SQL, a drop-in for ``MonthlyCube``.
+
+    ``con`` is a DuckDB connection or a function returning one.
+    """
+
+    approximate = False
+    summary_columns = ['Median_Price', 'Median_Days', 'Count']
+
+    def __init__(self, con, statuses=STATUS_LABELS, closed_only=False):
+        self.con = con
+        self.statuses = [status for status in statuses if not closed_only or status == 'Closed']
+
+    def _windows(self, starts, ends):
+        stats = _query_df(self.con, _WINDOWS_SQL, {
+            'statuses': self.statuses,
+            'windows': list(range(len(starts))),
+            'starts': [_to_param(start) for start in starts],
+            'ends': [_to_param(end) for end in ends]
+        })
+        return stats.set_index('Window').sort_index()
+
+    def query(self, start=None, end=None):
+        """Count and medians for closings with ``start <= Closed_Date <= end``."""
+        stats = self._windows([start], [end]).iloc[0]
+        return {'Count': int(stats['Count']),
+                **{metric: float(stats[metric]) for metric in ('Median_Price', 'Median_Days', 'Median_List')}}
+
+    def summarize_windows(self, windows, columns=None):
+        """Same output as ``window_utils.summarize_windows``, answered by one query."""
+        stats = self._windows(windows['Start_Date'], windows['End_Date'])
+        summary = windows.copy()
+        for col in columns or self.summary_columns:
+            summary[col] = stats[col].to_numpy(dtype=float if col != 'Count' else np.int64)
+        return summary
+
+
+def sql_monthly_summary(con, start_ed, end_ed, statuses=STATUS_LABELS):
+    """Same output as ``report_utils.monthly_summary``, grouped by DuckDB."""
+    month_list = calendar_bounds(start_ed, end_ed, 'monthly').labels.tolist()
+    summary = _query_df(con, _MONTHLY_SQL, {
+        'statuses': list(statuses),
+        'start': _to_param(start_ed),
+        'end': _to_param(end_ed)
+    })
+    summary = summary.set_index('Closed_Month').reindex(month_list).rename_axis('Closed_Month').reset_index()
+    return summary.dropna(subset=["Median_Price"]), month_list
+
+
+def period_summaries(ed_date, statuses=STATUS_LABELS, df=None, con=None):
+    """The Statistics, Yearly, Quarterly and Monthly frames for one ED.
+
+    Uses the DuckDB connection ``con`` when given, else the pandas cubes over ``df``.
+    """
+    if con is not None:
+        all_cube, closed_cube = SQLCube(con, statuses), SQLCube(con, statuses, closed_only=True)
+    else:
+        all_cube, closed_cube = build_cubes(df, statuses)
+    month_start, month_end = report_month_range(ed_date)
+    if con is not None:
+        monthly, _ = sql_monthly_summary(con, month_start, month_end, statuses)
+    else:
+        monthly, _ = monthly_summary(DatasetView(df).with_statuses(statuses).window(month_start, month_end).frame(),
+                                     month_start, month_end)
+    return {
+        'statistics': statistics_summary(all_cube, closed_cube, ed_date),
+        'yearly': yearly_summary(closed_cube, ed_date),
+        'quarterly': quarterly_summary(all_cube, ed_date),
+        'monthly': monthly
+    }
+
+
+def parity_check(df, ed_date, statuses=STATUS_LABELS, con=None, rtol=1e-9):
+    """Sections whose pandas and DuckDB summaries differ, as {section: message}; empty when they agree."""
+    con = con or connect(df)
+    expected = period_summaries(ed_date, statuses, df=df)
+    actual = period_summaries(ed_date, statuses, con=con)
+    mismatches = {}
+    for section in PARITY_SECTIONS:
+        try:
+            pd.testing.assert_frame_equal(actual[section].reset_index(drop=True), expected[section].reset_index(drop=True),
+                                          check_dtype=False, check_index_type=False, rtol=rtol)
+        except AssertionError as e:
+            mismatches[section] = str(e)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the pandas and DuckDB period summaries on one dataset.")
+    parser.add_argument('dataset', help="Saved .arrow dataset or .xlsx export")
+    parser.add_argument('--ed', action='append', required=True, help="Effective date (YYYY-MM-DD); repeatable")
+    parser.add_argument('--statuses', nargs='+', choices=STATUS_LABELS, default=STATUS_LABELS)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--memory-limit', default=None, help="DuckDB memory limit, e.g. 4GB")
+    args = parser.parse_args(argv)
+
+    require_duckdb()
+    df, _, _ = load_market([args.dataset])
+    source = args.dataset if args.dataset.endswith(DATASET_SUFFIX) else df
+    con = connect(source, threads=args.threads, memory_limit=args.memory_limit)
+
+    failures = 0
+    for ed in args.ed:
+        mismatches = parity_check(df, ed, args.statuses, con=con)
+        if mismatches:
+            failures += 1
+            for section, message in mismatches.items():
+                print(f"❌ {ed} {section}: {message}")
+        else:
+            print(f"✅ {ed}: pandas and DuckDB summaries match.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# ingest_utils.py
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+EXPECTED_COLUMNS = ['MLS #', 'Contract Date', 'Closed Date', 'Sold Pr', 'MT', 'Stat', 'List Price']
+CLEAN_COLUMNS = ['MLS_Number', 'Contract_Date', 'Closed_Date', 'Sold_Price', 'Market_Time', 'Status', 'List_Price']
+
+# Rows converted to typed arrays at a time while streaming a worksheet
+CHUNK_ROWS = 20_000
+
+# Upper bound for parsed frames kept in memory across sessions
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def get_file_summary(df, file_name):
+    row_count = len(df)
+    stat_counts = df['Stat'].value_counts().to_dict() if 'Stat' in df.columns else {}
+    return {
+        'file_name': file_name,
+        'row_count': row_count,
+        'stat_counts': stat_counts
+    }
+
+
+def file_digest(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class IngestCache:
+    """LRU cache of parsed & validated uploads, keyed by the SHA-256 of the file bytes.
+
+    Entries are evicted oldest-first once their combined in-memory size exceeds
+    ``max_bytes``. Cached frames are shared between sessions, so callers must
+    treat them as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df):
+        size = frame_nbytes(df)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            # A single frame larger than the whole budget is never cached
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+def validate_columns(columns):
+    return list(columns[:len(EXPECTED_COLUMNS)]) == EXPECTED_COLUMNS
+
+
+def _rows_to_frame(rows):
+    mls, contract, closed, sold, market_time, stat, list_price = (np.array(col, dtype=object) for col in zip(*rows))
+    return pd.DataFrame({
+        'MLS #': pd.Series(mls).infer_objects(),
+        'Contract Date': pd.to_datetime(contract),
+        'Closed Date': pd.to_datetime(closed),
+        'Sold Pr': pd.to_numeric(sold, errors='coerce'),
+        'MT': pd.to_numeric(market_time, errors='coerce'),
+        'Stat': stat,
+        'List Price': pd.to_numeric(list_price, errors='coerce')
+    })
+
+
+def read_excel_file(file_bytes, chunk_rows=CHUNK_ROWS):
+    """Stream the first worksheet of an .xlsx export into a typed frame.
+
+    The header row is checked before any data is read, and only the seven
+    expected columns are pulled from the sheet, so wide or misformatted files
+    cost little. Raises on unreadable workbooks; returns None if the header
+    doesn't match ``EXPECTED_COLUMNS``.
+    """
+    n_cols = len(EXPECTED_COLUMNS)
+    workbook = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_col=1, max_col=n_cols, values_only=True)
+
+        header = next(rows, None)
+        if header is None or not validate_columns(header):
+            return None
+
+        chunks = []
+        buffer = []
+        for row in rows:
+            if len(row) < n_cols:
+                row = row + (None,) * (n_cols - len(row))
+            # Skip blank rows (e.g. formatted but empty trailing rows)
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                chunks.append(_rows_to_frame(buffer))
+                buffer = []
+        if buffer or not chunks:
+            chunks.append(_rows_to_frame(buffer) if buffer else pd.DataFrame(columns=EXPECTED_COLUMNS))
+    finally:
+        workbook.close()
+
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def column_mismatch_message(file_name):
+    expected_list = "\n".join(f"{i}. {col}" for i, col in enumerate(EXPECTED_COLUMNS, start=1))
+    return f"""❌ Column mismatch in `{file_name}`.
+The first seven columns must exactly match (in order):
+{expected_list}
+"""
+
+
+def ingest_file(file_bytes, file_name):
+    # Runs inside a worker process: parse, validate and summarize one upload
+    result = {'file_name': file_name, 'df': None, 'summary': None, 'error': None}
+    try:
+        df_raw = read_excel_file(file_bytes)
+    except Exception as e:
+        result['error'] = f"❌ Failed to read `{file_name}`. Error: {e}"
+        return result
+
+    if df_raw is None:
+        result['error'] = column_mismatch_message(file_name)
+        return result
+
+    result['df'] = df_raw
+    result['summary'] = get_file_summary(df_raw, file_name)
+    return result
+
+
+def iter_ingest(jobs, max_workers=None):
+    """Ingest ``(file_bytes, file_name)`` jobs, one worker process per file.
+
+    Yields ``(job_index, result)`` pairs in completion order so callers can
+    report progress without waiting for the slowest file; use the index to
+    restore upload order. A single job is handled in-process.
+    """
+    if not jobs:
+        return
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if workers == 1:
+        for index, (file_bytes, file_name) in enumerate(jobs):
+            yield index, ingest_file(file_bytes, file_name)
+        return
+
+    # Spawn rather than fork: the Streamlit server process is multi-threaded
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(ingest_file, file_bytes, file_name): index
+            for index, (file_bytes, file_name) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -2,10 +2,15 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from datetime import timedelta
 import altair as alt
-from data_utils import get_file_summary, load_and_clean_data, add_months_since_ed, get_month_range_input, get_year_range_input, get_date_range_input, generate_12_month_summary, generate_listing_summary
-from plot_utils import plot_chart, plot_summary_table, plot_individual_scatter, plot_combo_chart_with_table
+from ingest_utils import CLEAN_COLUMNS
+from store_utils import list_datasets, load_dataset, save_dataset, stored_dataset_id, stored_dataset_name
+from window_utils import sort_by_closed_date, window_bounds
+from clean_utils import DEDUP_RULES, DEFAULT_DEDUP_RULE, upsert_by_mls_number, memory_report
+from data_utils import DIAGNOSTICS_DEFAULT, TRACE_MEMORY_DEFAULT, QUERY_BACKENDS, start_perf_run, perf_stage, finish_perf_run, open_dataset, current_dataset, derived, read_uploaded_files, uploads_dataset_id, patch_cubes, approximate_badge, load_and_clean_data, get_month_range_input, get_year_range_input, get_date_range_input, get_ed_sweep_input
+from report_utils import format_12_month_summary
+from duckdb_utils import DUCKDB_AVAILABLE
+from plot_utils import plot_chart_section, plot_summary_table, plot_individual_scatter, plot_combo_chart_with_table, plot_ed_sweep
 
 # Streamlit config
 st.set_page_config(page_title="Trautman Appraisal Dashboard", layout="wide")
@@ -13,20 +18,73 @@ st.set_page_config(page_title="Trautman Appraisal Dashboard", layout="wide")
 DEFAULT_ED_DATE = datetime.today().strftime("%Y-%m-%d")
 
 # Init state
-if 'df_clsd' not in st.session_state or 'active_page' not in st.session_state:
+if 'dataset' not in st.session_state or 'active_page' not in st.session_state:
     st.session_state.active_page = 'Home'
 
+start_perf_run()
+
 # Sidebar
 with st.sidebar:
-    if 'df_clsd' in st.session_state:
+    if 'dataset' in st.session_state:
         st.markdown("## Navigation")
-        menu = st.radio("", ["Statistics", "Yearly Analysis", "Quarterly Analysis", "Monthly Analysis", "Individual Analysis"])
+        menu = st.radio("", ["Statistics", "Yearly Analysis", "Quarterly Analysis", "Monthly Analysis", "Individual Analysis", "ED Sweep"])
         st.session_state.active_page = menu
 
         st.markdown("## Effective Date (ED)")
         ed_date = st.date_input("Select ED", pd.to_datetime(st.session_state.get('ed_date', DEFAULT_ED_DATE)))
         st.session_state.ed_date = ed_date
 
+        st.markdown("## Medians")
+        if DUCKDB_AVAILABLE:
+            backends = list(QUERY_BACKENDS)
+            st.session_state.query_backend = st.radio(
+                "Query backend", backends, format_func=QUERY_BACKENDS.get, horizontal=True,
+                index=backends.index(st.session_state.get('query_backend', 'pandas')),
+                help="DuckDB runs the period summaries as multi-threaded SQL. Always exact."
+            )
+        approx_mode = st.toggle("⚡ Approximate mode", value=st.session_state.get('approx_mode', False),
+                                disabled=st.session_state.get('query_backend') == 'duckdb',
+                                help="Use mergeable quantile sketches instead of exact medians. Recommended for very large datasets.")
+        st.session_state.approx_mode = approx_mode
+        if approx_mode:
+            st.session_state.approx_error = st.number_input(
+                "Max relative error (%)", min_value=0.1, max_value=10.0,
+                value=st.session_state.get('approx_error', 1.0), step=0.1
+            )
+
+        # ➕ Upsert a newer export into the loaded dataset
+        with st.expander("➕ Append New Export"):
+            append_files = st.file_uploader("Newer export(s) (.xlsx)", type=['xlsx'], accept_multiple_files=True, key='append_files')
+            if append_files and st.button("➕ Append & Update"):
+                append_results, append_valid = read_uploaded_files(append_files)
+                if append_valid:
+                    try:
+                        delta = load_and_clean_data(pd.concat(
+                            [result['df'].set_axis(CLEAN_COLUMNS, axis=1) for result in append_results], ignore_index=True
+                        ), st.session_state.get('dedup_rule', DEFAULT_DEDUP_RULE))
+                    except ValueError as e:
+                        st.error(str(e))
+                        st.stop()
+
+                    old_dataset_id = st.session_state.dataset.dataset_id
+                    merged, replaced = upsert_by_mls_number(current_dataset(), delta)
+                    # Written back only if the open dataset is (still) the saved one
+                    saved_name = stored_dataset_name(old_dataset_id)
+                    if saved_name:
+                        try:
+                            save_dataset(merged, saved_name)
+                        except (ValueError, OSError) as e:
+                            st.error(f"❌ Failed to save dataset. Error: {e}")
+                            st.stop()
+                        new_dataset_id = stored_dataset_id(saved_name)
+                    else:
+                        new_dataset_id = (f"{old_dataset_id}+{uploads_dataset_id(append_files)}"
+                                          f":{st.session_state.get('dedup_rule', DEFAULT_DEDUP_RULE)}")
+                    patch_cubes(old_dataset_id, new_dataset_id, merged, replaced, delta)
+
+                    open_dataset(new_dataset_id, lambda: merged)
+                    st.success(f"✅ {len(replaced)} listing(s) updated, {len(delta) - len(replaced)} added.")
+
         st.markdown("---")
         if st.button("🔄 Reload Data"):
             for key in list(st.session_state.keys()):
@@ -34,9 +92,43 @@ with st.sidebar:
             st.rerun()
     else:
         st.markdown("🚀 Please upload data first.")
+
+    # 🩺 Stage timings of this rerun, filled in at the end of the script
+    st.toggle("🩺 Diagnostics", value=DIAGNOSTICS_DEFAULT, key='diagnostics',
+              help="Show wall time and rows per stage of each rerun.")
+    if st.session_state.diagnostics:
+        st.toggle("🧠 Trace memory", value=TRACE_MEMORY_DEFAULT, key='trace_memory',
+                  help="Also record peak memory per stage. Tracing slows the rerun down, so the times shown run high.")
+    diagnostics_panel = st.container()
 # Home Upload Page
 if st.session_state.active_page == 'Home':
     st.title("🏡 Trautman Appraisal Dashboard - Upload Data")
+
+    # 📂 Previously saved datasets (listed from file metadata only)
+    saved_datasets = list_datasets()
+    if saved_datasets:
+        st.subheader("📂 Saved Datasets")
+        st.dataframe(pd.DataFrame([{
+            "Dataset": info['name'],
+            "Rows": info.get('row_count'),
+            "Closed From": info.get('closed_start'),
+            "Closed To": info.get('closed_end'),
+            "Saved At": info.get('saved_at'),
+            "Size (MB)": round(info['size_mb'], 2)
+        } for info in saved_datasets]), hide_index=True, use_container_width=True)
+
+        dataset_name = st.selectbox("Select a saved dataset", [info['name'] for info in saved_datasets])
+        if st.button("📂 Open Dataset"):
+            # Loaded from disk only if no other session has this version open
+            open_dataset(stored_dataset_id(dataset_name), lambda: sort_by_closed_date(load_dataset(dataset_name)))
+            st.session_state.ready_to_analyze = False
+            if 'ed_date' not in st.session_state:
+                st.session_state.ed_date = pd.to_datetime(DEFAULT_ED_DATE)
+
+            st.session_state.active_page = 'Statistics'
+            st.rerun()
+        st.markdown("---")
+
     uploaded_files = st.file_uploader("Upload one or more Excel files (.xlsx)", type=['xlsx'], accept_multiple_files=True)
 
     if uploaded_files:
@@ -47,47 +139,14 @@ if st.session_state.active_page == 'Home':
             st.session_state.ready_to_analyze = False
             st.session_state.last_uploaded_files = uploaded_names
 
-        expected_columns = ['MLS #', 'Contract Date', 'Closed Date', 'Sold Pr', 'MT', 'Stat', 'List Price']
-        all_valid = True
-        dataframes = []
-
-        for file in uploaded_files:
-            if not file.name.endswith('.xlsx'):
-                st.error(f"❌ `{file.name}` is not an Excel file.")
-                all_valid = False
-                break
-
-            try:
-                df_raw = pd.read_excel(file)
-            except Exception as e:
-                st.error(f"❌ Failed to read `{file.name}`. Error: {e}")
-                all_valid = False
-                break
-
-            if list(df_raw.columns[:7]) != expected_columns:
-                st.error(f"""❌ Column mismatch in `{file.name}`.
-The first seven columns must exactly match (in order):
-1. MLS #
-2. Contract Date
-3. Closed Date
-4. Sold Pr
-5. MT
-6. Stat
-7. List Price
-""")
-                all_valid = False
-                break
-
-            dataframes.append((file.name, df_raw))
+        results, all_valid = read_uploaded_files(uploaded_files)
+        dataframes = [(result['file_name'], result['df']) for result in results if result is not None and not result['error']]
 
         # Show Confirm Files button only if all are valid
         if all_valid:
             st.success(f"✅ {len(uploaded_files)} file(s) passed format check.")
             if st.button("📋 Confirm Files"):
-                st.session_state.file_summaries = []
-                for name, df in dataframes:
-                    summary = get_file_summary(df, name)
-                    st.session_state.file_summaries.append(summary)
+                st.session_state.file_summaries = [result['summary'] for result in results]
                 st.session_state.ready_to_analyze = True
 
         # Show summary info after confirmation
@@ -98,16 +157,32 @@ The first seven columns must exactly match (in order):
                 st.write(f"- Total Rows: {summary['row_count']}")
                 st.write("- `Stat` Value Counts:")
                 st.write(summary['stat_counts'])
-            dfs = []
-            for _, df in dataframes:
-                df.columns = ['MLS_Number', 'Contract_Date', 'Closed_Date', 'Sold_Price', 'Market_Time', 'Status', 'List_Price']
-                dfs.append(df)
+            # Cached frames are shared, so rename into new frames instead of in place
+            dfs = [df.set_axis(CLEAN_COLUMNS, axis=1) for _, df in dataframes]
 
             df_all = pd.concat(dfs, ignore_index=True)
-            df_cleaned = load_and_clean_data(df_all)
+            st.session_state.dedup_rule = st.selectbox(
+                "Records sharing an MLS #", options=list(DEDUP_RULES), format_func=DEDUP_RULES.get,
+                index=list(DEDUP_RULES).index(st.session_state.get('dedup_rule', DEFAULT_DEDUP_RULE))
+            )
+            try:
+                df_cleaned = load_and_clean_data(df_all, st.session_state.dedup_rule)
+            except ValueError as e:
+                st.error(str(e))
+                st.stop()
+
+            # 💾 Save the cleaned data so later sessions can skip the Excel upload
+            save_name = st.text_input("Dataset name", value=uploaded_names[0].rsplit('.', 1)[0])
+            if st.button("💾 Save Dataset"):
+                try:
+                    saved_name = save_dataset(df_cleaned, save_name)
+                    st.success(f"✅ Saved dataset `{saved_name}` ({len(df_cleaned)} rows).")
+                except (ValueError, OSError) as e:
+                    st.error(f"❌ Failed to save dataset. Error: {e}")
 
             if st.button("🔍 Start Analysis"):
-                st.session_state.df_clsd = df_cleaned
+                # The dedup rule changes the cleaned rows, so it is part of the id
+                open_dataset(f"{uploads_dataset_id(uploaded_files)}:{st.session_state.dedup_rule}", lambda: df_cleaned)
                 st.session_state.ready_to_analyze = False
                 if 'ed_date' not in st.session_state:
                     st.session_state.ed_date = pd.to_datetime(DEFAULT_ED_DATE)
@@ -123,12 +198,19 @@ The first seven columns must exactly match (in order):
 if st.session_state.active_page == "Statistics":
     st.header("📈 Data Summary - Trautman Appraisal")
 
-    if 'df_clsd' in st.session_state:
-        df = add_months_since_ed(st.session_state.df_clsd.copy(), st.session_state.ed_date)
+    if 'dataset' in st.session_state:
+        df = current_dataset()
 
         st.write(f"Effective Date (ED): **{st.session_state.ed_date.strftime('%Y-%m-%d')}**")
         st.write(f"Number of records: **{df.shape[0]}**")
 
+        # 💾 Memory footprint of the loaded dataset
+        with st.expander("💾 Memory Footprint"):
+            mem_report = memory_report(df)
+            st.write(f"Total: **{mem_report['Memory (MB)'].sum():,.2f} MB** "
+                     f"({mem_report['Bytes / Row'].sum():,.1f} bytes per row)")
+            st.dataframe(mem_report.style.format({'Memory (MB)': '{:,.3f}', 'Bytes / Row': '{:,.1f}'}), use_container_width=True)
+
         # ---- Property Status Summary ----
         st.subheader("📊 Property Status Summary")
         status_counts = df['Mapped_Status'].value_counts().to_dict()
@@ -147,43 +229,46 @@ if st.session_state.active_page == "Statistics":
         st.subheader("✅ Filter by Status")
         selected_statuses = st.multiselect("Select status:", options=status_labels, default=status_labels)
 
-        df_filtered = df[df['Mapped_Status'].isin(selected_statuses)]
-        st.write(f"**Showing {len(df_filtered)} of {len(df)} properties(Filter by Status)**")
-        st.dataframe(df_filtered.head(5))
-        st.session_state.df_filtered = df_filtered
+        st.session_state.selected_statuses = tuple(sorted(selected_statuses))
+        with perf_stage('status_filter') as stage:
+            filtered = derived('filtered')
+            stage['rows'] = len(filtered)
+        st.write(f"**Showing {len(filtered)} of {len(df)} properties(Filter by Status)**")
+        st.dataframe(derived('head'))
 
         # ---- 📌 Extended Summary Metrics by 12-Month Periods ----
         st.markdown("---")
         st.subheader("📌 Summary Metrics by 12-Month Periods")
-        period_end = pd.Timestamp(st.session_state.ed_date)
-
-        for i in range(5):
-            if i == 0:
-                period_start = period_end - pd.DateOffset(years=1)
-            else:
-                period_end = period_start - timedelta(days=1)
-                period_start = period_end - pd.DateOffset(years=1) + timedelta(days=1)
+        # 🧊 Windows are answered from per-month cubes, so changing the ED never rescans rows
+        with perf_stage('window_summaries', rows=len(filtered)):
+            all_cube = derived('all_cube')
+            period_stats, closed_stats = derived('statistics')
 
+        for i, period in period_stats.iterrows():
             period_label = f"{i*12}–{(i+1)*12} Month Summary"
-            st.markdown(f"**📆 {period_label}**  \nDate Range: **{period_end.date()}** to **{period_start.date()}**")
-            df_period = df_filtered[
-                (df_filtered['Closed_Date'] <= period_end) &
-                (df_filtered['Closed_Date'] >= period_start)
-            ]
+            st.markdown(f"**📆 {period_label}**  \nDate Range: **{period['End_Date'].date()}** to **{period['Start_Date'].date()}**")
 
-            if not df_period.empty:
-                median_price = df_period['Sold_Price'].median()
-                median_days = df_period['Market_Time'].median()
-                total_properties = len(df_period)
+            if period['Count'] > 0:
+                median_price = period['Median_Price']
+                median_days = period['Median_Days']
+                total_properties = int(period['Count'])
 
                 col1, col2, col3 = st.columns(3)
                 col1.metric("Median Sales Price", f"${int(median_price):,}" if pd.notna(median_price) else "N/A")
                 col2.metric("Median Days", f"{int(median_days)} days" if pd.notna(median_days) else "N/A")
                 col3.metric("Total Properties", total_properties)
-
-                summary_text = generate_12_month_summary(df_period)
+                if all_cube.approximate:
+                    st.markdown(
+                        f"{approximate_badge(all_cube)} &nbsp; Sales price P10–P90: "
+                        f"**&#36;{period['P10_Price']:,.0f} – &#36;{period['P90_Price']:,.0f}**",
+                        unsafe_allow_html=True
+                    )
+
+                closed = closed_stats.loc[i]
+                summary_text = format_12_month_summary(closed['Count'], closed['Median_Days'], closed['Median_Price'])
                 if i == 0:
-                    listing_text = generate_listing_summary(df_filtered, st.session_state.ed_date)
+                    with perf_stage('listing_summary'):
+                        listing_text = derived('listing_summary')
                     st.markdown(summary_text, unsafe_allow_html=True)
                     st.markdown(listing_text, unsafe_allow_html=True)
                 else:
@@ -197,14 +282,13 @@ if st.session_state.active_page == "Statistics":
         st.markdown("---")
         st.subheader("📌 Missing Values Check")
 
-        na_counts = df_filtered.isna().sum()
-        na_counts = na_counts[na_counts > 0]
-        df_missing = df_filtered[df_filtered.isna().any(axis=1)]
+        with perf_stage('missing_values', rows=len(filtered)):
+            na_counts, missing = derived('missing')
 
         if not na_counts.empty:
             st.write("⚠️ The following columns have missing values:")
             st.dataframe(na_counts.rename("Missing Count"))
-            st.dataframe(df_missing)
+            st.dataframe(missing.frame().assign(Months_Since_ED=derived('missing_months')))
         else:
             st.success("✅ No missing values detected in the current data.")
 
@@ -214,42 +298,19 @@ if st.session_state.active_page == "Statistics":
 # Yearly Analysis
 elif st.session_state.active_page == "Yearly Analysis":
     st.header("📊 Yearly Analysis")
-    if 'df_filtered' in st.session_state:
-        df = st.session_state.df_filtered.copy()
-        df = df[df['Mapped_Status'] == 'Closed']
+    if 'selected_statuses' in st.session_state:
+        with perf_stage('yearly_summary'):
+            closed_cube = derived('closed_cube')
 
-        ed_date = pd.Timestamp(st.session_state.ed_date)
-
-        summary_data = []
-        for i in range(5):
-            if i == 0:
-                period_end = ed_date
-                period_start = period_end - pd.DateOffset(years=1)
-            else:
-                period_end = period_start - timedelta(days=1)
-                period_start = period_end - pd.DateOffset(years=1) + timedelta(days=1)
-
-            df_period = df[(df['Closed_Date'] >= period_start) & (df['Closed_Date'] <= period_end)]
-            if df_period.empty:
-                continue
-
-            summary_data.append({
-                "Period": f"{i*12}–{(i+1)*12} Month",
-                "Date_Range": f"{period_start.date()} to {period_end.date()}",
-                "Median_Price": df_period['Sold_Price'].median(),
-                "Median_Days": df_period['Market_Time'].median(),
-                "Count": df_period.shape[0],
-                "Sort_Key": i
-            })
-
-        summary = pd.DataFrame(summary_data)
-        summary = summary.sort_values(by="Sort_Key", ascending=False).reset_index(drop=True)
-        summary.drop(columns="Sort_Key", inplace=True)
+            # 📊 All five 12-month windows from the cube, oldest first
+            summary = derived('yearly')
 
         if summary.empty:
             st.warning("⚠️ No data available in the 5-year period.")
         else:
             st.subheader("📊 12-Month Rolling Summary (Based on Effective Date)")
+            if closed_cube.approximate:
+                st.markdown(approximate_badge(closed_cube), unsafe_allow_html=True)
 
             # ✅ Add slider to select range
             available_periods = summary["Period"].tolist()
@@ -270,8 +331,7 @@ elif st.session_state.active_page == "Yearly Analysis":
             plot_combo_chart_with_table(summary_selected, x_col="Period", x_order=x_order)
 
             st.markdown("---")
-            chart_type = st.selectbox("Select Chart Type", ["line", "scatter", "histogram"])
-            plot_chart(summary_selected, x_col="Period", chart_type=chart_type, x_order=x_order)
+            plot_chart_section(summary_selected, x_col="Period", x_order=x_order)
             plot_summary_table(summary_selected, x_col="Period")
 
     else:
@@ -283,23 +343,15 @@ elif st.session_state.active_page == "Yearly Analysis":
 elif st.session_state.active_page == "Quarterly Analysis":
     st.header("📊 Quarterly Analysis")
 
-    if 'df_filtered' in st.session_state:
-        df = st.session_state.df_filtered.copy()
+    if 'selected_statuses' in st.session_state:
         ed = st.session_state.ed_date
 
         # Create rolling 3-month custom quarters: Q1 (most recent) to Q20 (oldest)
-        quarter_ranges = []
-        for i in range(20):
-            end_date = ed - pd.DateOffset(months=3 * i)
-            start_date = end_date - pd.DateOffset(months=3)
-            if i > 0:
-                end_date = ed - pd.DateOffset(months=3 * i) - pd.Timedelta(days=1)
-                start_date = end_date - pd.DateOffset(months=3) + pd.Timedelta(days=1)
-            quarter_ranges.append({
-                "Quarter": f"Q{i+1}",
-                "Start_Date": start_date,
-                "End_Date": end_date
-            })
+        quarter_windows = window_bounds(ed, 'quarterly', 20).frame(labels=False)
+        quarter_ranges = [
+            {"Quarter": f"Q{i+1}", "Start_Date": window['Start_Date'], "End_Date": window['End_Date']}
+            for i, window in quarter_windows.iterrows()
+        ]
 
         quarter_ranges = quarter_ranges[::-1]
         quarter_labels = [q["Quarter"] for q in quarter_ranges]
@@ -320,27 +372,12 @@ elif st.session_state.active_page == "Quarterly Analysis":
             for qr in quarter_ranges:
                 st.markdown(f"- **{qr['Quarter']}** = {qr['Start_Date'].date()} to {qr['End_Date'].date()}")
 
-        # 📊 Filter & summarize data
-        summary_data = []
-        for q in quarter_ranges:
-            if q["Quarter"] not in selected_quarters:
-                continue
-
-            start_q, end_q = q["Start_Date"], q["End_Date"]
-            df_q = df[(df['Closed_Date'] >= start_q) & (df['Closed_Date'] <= end_q)]
-            if df_q.empty:
-                continue
-
-            summary_data.append({
-                "Quarter": q["Quarter"],
-                "Median_Price": df_q['Sold_Price'].median(),
-                "Median_Days": df_q['Market_Time'].median(),
-                "Count": df_q.shape[0],
-                "Date_Range": f"{start_q.date()} to {end_q.date()}"
-            })
-
-        # 📈 Create summary DataFrame in selected order
-        summary = pd.DataFrame(summary_data)
+        # 📊 Summarize all quarters from the cube, then keep the selected ones
+        with perf_stage('quarterly_summary'):
+            all_cube = derived('all_cube')
+            summary = derived('quarterly')
+
+        # 📈 Keep the selected quarters, in order
         summary = summary.set_index("Quarter").reindex(selected_quarters).dropna().reset_index()
 
         if summary.empty:
@@ -349,14 +386,15 @@ elif st.session_state.active_page == "Quarterly Analysis":
             start_label = summary["Quarter"].iloc[0]
             end_label = summary["Quarter"].iloc[-1]
             st.subheader(f"📊 Quarterly Summary ({start_label} to {end_label})")
+            if all_cube.approximate:
+                st.markdown(approximate_badge(all_cube), unsafe_allow_html=True)
 
             x_order = summary["Quarter"].tolist()
 
             plot_combo_chart_with_table(summary, x_col="Quarter", x_order=x_order)
 
             st.markdown("---")
-            chart_type = st.selectbox("Select Chart Type", ["line", "scatter", "histogram"])
-            plot_chart(summary, "Quarter", chart_type=chart_type, x_order=x_order)
+            plot_chart_section(summary, "Quarter", x_order=x_order)
             plot_summary_table(summary, "Quarter")
 
     else:
@@ -367,26 +405,10 @@ elif st.session_state.active_page == "Quarterly Analysis":
 # Monthly Analysis
 elif st.session_state.active_page == "Monthly Analysis":
     st.header("📊 Monthly Analysis")
-    if 'df_filtered' in st.session_state:
-        df = st.session_state.df_filtered.copy()
-
+    if 'selected_statuses' in st.session_state:
         start_ed, end_ed = get_month_range_input()
-        df = df[(df['Closed_Date'] >= pd.to_datetime(start_ed)) &
-                (df['Closed_Date'] <= pd.to_datetime(end_ed))]
-
-        df['Closed_Month'] = df['Closed_Date'].dt.to_period('M').astype(str)
-
-        month_list = pd.period_range(start=start_ed, end=end_ed, freq='M').astype(str).tolist()
-        summary = df.groupby('Closed_Month').agg(
-            Median_Price=('Sold_Price', 'median'),
-            Median_Days=('Market_Time', 'median'),
-            Count=('Sold_Price', 'count')
-        ).reindex(month_list).reset_index()
-
-        summary = summary.rename(columns={"index": "Closed_Month"})
-
-        # Optional: remove rows with no data
-        summary = summary.dropna(subset=["Median_Price"])
+        with perf_stage('monthly_summary'):
+            summary, month_list = derived('monthly', date_range=(start_ed, end_ed))
 
         start_label = month_list[0]
         end_label = month_list[-1]
@@ -395,8 +417,7 @@ elif st.session_state.active_page == "Monthly Analysis":
         plot_combo_chart_with_table(summary, x_col="Closed_Month", x_order=month_list)
 
         st.markdown("---")
-        chart_type = st.selectbox("Select Chart Type", ["line", "scatter", "histogram"])
-        plot_chart(summary, "Closed_Month", chart_type, x_order=month_list)
+        plot_chart_section(summary, "Closed_Month", x_order=month_list)
         plot_summary_table(summary, "Closed_Month")
 
     else:
@@ -405,19 +426,37 @@ elif st.session_state.active_page == "Monthly Analysis":
 # Individual Analysis
 elif st.session_state.active_page == "Individual Analysis":
     st.header("🔍 Individual Property Scatter Plot")
-    if 'df_filtered' in st.session_state:
-        df = st.session_state.df_filtered.copy()
-
+    if 'selected_statuses' in st.session_state:
         start_ed, end_ed = get_date_range_input()
-        df = df[(df['Closed_Date'] >= pd.to_datetime(start_ed)) &
-                (df['Closed_Date'] <= pd.to_datetime(end_ed))]
+        with perf_stage('window_slice') as stage:
+            df = derived('window', date_range=(start_ed, end_ed)).frame()
+            stage['rows'] = len(df)
 
         st.write(f"Showing {len(df)} records")
         plot_individual_scatter(df)
     else:
         st.warning("⚠️ Please upload data first on Home page!")
 
+# ED Sweep
+elif st.session_state.active_page == "ED Sweep":
+    st.header("🔁 Effective Date Sweep")
+    if 'selected_statuses' in st.session_state:
+        eds = get_ed_sweep_input()
+        # 🧊 All EDs are answered together from the cubes, without a rerun per ED
+        with perf_stage('ed_sweep', rows=len(eds)):
+            all_cube = derived('all_cube')
+            summary, quarterly = derived('ed_sweep', eds=eds)
+
+        st.write(f"Comparing **{len(eds)}** effective dates from **{eds[0].date()}** to **{eds[-1].date()}**")
+        if all_cube.approximate:
+            st.markdown(approximate_badge(all_cube), unsafe_allow_html=True)
+        plot_ed_sweep(summary, quarterly)
+    else:
+        st.warning("⚠️ Please upload data first on Home page!")
+
 
 # Footer
 st.markdown("---")
 st.markdown("© 2025 Trautman Analytics - Appraisal Dashboard")
+
+finish_perf_run(diagnostics_panel)
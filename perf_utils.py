@@ -0,0 +1,105 @@
+# perf_utils.py
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("dashboard.perf")
+if not logger.handlers:
+    # One JSON object per line, for log scrapers
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class NullRecorder:
+    """Stand-in used when diagnostics are off: every stage is a shared no-op context."""
+
+    enabled = False
+    finished = False
+    records = ()
+    _stage = nullcontext({})
+
+    def stage(self, name, rows=None):
+        return self._stage
+
+    def finish(self, **fields):
+        return None
+
+
+NULL_RECORDER = NullRecorder()
+
+
+class StageRecorder:
+    """Wall time, row count and (optionally) peak memory of the named stages of one rerun.
+
+    Stages may nest. With ``trace_memory``, peak memory is the highest traced
+    allocation (via tracemalloc) above what was allocated when the stage
+    started. Tracing slows every allocation down, inflating the wall times,
+    and is process-wide, so concurrent sessions add to each other's figures.
+    Each finished stage is logged as one JSON line, saying whether memory was
+    traced.
+    """
+
+    enabled = True
+
+    def __init__(self, run_id, trace_memory=False):
+        self.run_id = run_id
+        self.records = []
+        self.trace_memory = trace_memory
+        self.finished = False
+        self._stack = []
+        self._run_peak = 0
+        self._started_stages = 0
+        self._started = time.perf_counter()
+        self._owns_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        # The yielded record can be updated inside the block, e.g. rows known only at the end
+        record = {'stage': name, 'rows': rows, 'depth': len(self._stack), 'order': self._started_stages}
+        self._started_stages += 1
+        # Another session's recorder may have stopped tracing in the meantime
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]['_peak'] = max(self._stack[-1]['_peak'], peak)
+            self._run_peak = max(self._run_peak, peak)
+            tracemalloc.reset_peak()
+            record['_base'] = record['_peak'] = current
+        self._stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['ms'] = (time.perf_counter() - start) * 1000
+            self._stack.pop()
+            if '_base' in record:
+                peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+                record['peak_mb'] = (peak - record.pop('_base')) / 1024 ** 2
+                self._run_peak = max(self._run_peak, peak)
+                if self._stack:
+                    self._stack[-1]['_peak'] = max(self._stack[-1]['_peak'], peak)
+            self.records.append(record)
+            self._log('stage', **record)
+
+    def finish(self, **fields):
+        """Log the rerun total (plus ``fields``, e.g. the page) and stop tracing."""
+        self.finished = True
+        total = {'ms': (time.perf_counter() - self._started) * 1000, 'stages': len(self.records),
+                 'trace_memory': self.trace_memory, **fields}
+        if self._owns_tracing and tracemalloc.is_tracing():
+            total['peak_mb'] = max(self._run_peak, tracemalloc.get_traced_memory()[1]) / 1024 ** 2
+            tracemalloc.stop()
+        self._log('rerun', **total)
+        return total
+
+    def _log(self, event, **fields):
+        fields = {key: round(value, 3) if isinstance(value, float) else value for key, value in fields.items()}
+        logger.info(json.dumps({'event': event, 'run': self.run_id, 'trace_memory': self.trace_memory, **fields},
+                               default=str))
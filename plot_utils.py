@@ -2,6 +2,7 @@ import streamlit as st
 import altair as alt
 import pandas as pd
 import numpy as np
+from data_utils import perf_fragment, perf_stage
 
 def convert_x_to_numeric(df, x_col):
     if x_col == "Year":
@@ -20,15 +21,79 @@ def convert_quarter_to_number(quarter_str):
     year, q = quarter_str.split('Q')
     return int(year) + (int(q) - 1) * 0.25
 
-def plot_chart(df, x_col, chart_type="line", x_order=None):
-    st.subheader("📈 Custom Charts")
-
+@st.cache_data(max_entries=256, show_spinner=False)
+def fit_trendline(x, y):
+    """Least-squares line through the (x, y) pairs that have no missing value.
+
+    Returns the slope, intercept and the line's endpoints at the smallest and
+    largest x, or None with fewer than two usable points. Cached on the data,
+    so reruns and checkbox toggles don't refit.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    if valid.sum() < 2:
+        return None
+    a, b = np.polyfit(x[valid], y[valid], deg=1)
+    ends = np.array([x[valid].min(), x[valid].max()])
+    return {'slope': a, 'intercept': b, 'x': ends, 'y': a * ends + b}
+
+CHART_TYPES = ["line", "scatter", "histogram"]
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def chart_frame(df, x_col, x_order=None):
+    # Summary rows plus a numeric X_Num for trendlines, built once per summary
     df = df.copy()
     if x_order:
         order_map = {label: i for i, label in enumerate(x_order)}
         df['X_Num'] = df[x_col].map(order_map)
     else:
         df['X_Num'] = convert_x_to_numeric(df, x_col)
+    return df
+
+@st.fragment
+@perf_fragment('custom charts')
+def plot_chart_section(df, x_col, x_order=None):
+    # Chart type and trendline toggles rerun only this section, not the page
+    chart_type = st.selectbox("Select Chart Type", CHART_TYPES)
+    plot_chart(df, x_col, chart_type, x_order=x_order)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def metric_chart_spec(df, x_col, y_col, title, chart_type, x_order=None, fit=None):
+    """Vega-Lite spec of one custom chart, plus its trend line when ``fit`` is given.
+
+    Building and validating an Altair chart takes tens of milliseconds, so a
+    toggle reuses the specs of the charts it didn't change.
+    """
+    encodings = {
+        'x': alt.X(f'{x_col}:N', title='Period', sort=x_order),
+        'y': alt.Y(f'{y_col}:Q', title=title),
+        'tooltip': [x_col, y_col, 'Count']
+    }
+
+    if chart_type == "line":
+        base = alt.Chart(df).mark_line(point=True).encode(**encodings)
+    elif chart_type == "scatter":
+        base = alt.Chart(df).mark_circle(size=60).encode(**encodings)
+    else:
+        base = alt.Chart(df).mark_bar().encode(**encodings)
+
+    if fit is None:
+        return base.properties(width=800, height=300).to_dict()
+
+    # Only the line's two endpoints go to the browser
+    trend = alt.Chart(pd.DataFrame({'X_Num': fit['x'], y_col: fit['y']})).mark_line(
+        color='red', strokeWidth=1.5, strokeDash=[5, 2]
+    ).encode(
+        x=alt.X('X_Num:Q', axis=None),
+        y=alt.Y(f'{y_col}:Q')
+    )
+    return (base + trend).properties(width=800, height=300).to_dict()
+
+def plot_chart(df, x_col, chart_type="line", x_order=None):
+    st.subheader("📈 Custom Charts")
+
+    df = chart_frame(df, x_col, x_order)
 
     metrics = [
         ("Median_Price", "Median Price"),
@@ -43,51 +108,34 @@ def plot_chart(df, x_col, chart_type="line", x_order=None):
             f"Show trendline for {title}", value=True, key=f"trendline_{y_col}"
         )
 
-        encodings = {
-            'x': alt.X(f'{x_col}:N', title='Period', sort=x_order),
-            'y': alt.Y(f'{y_col}:Q', title=title),
-            'tooltip': [x_col, y_col, 'Count']
-        }
-
-        if chart_type == "line":
-            base = alt.Chart(df).mark_line(point=True).encode(**encodings)
-        elif chart_type == "scatter":
-            base = alt.Chart(df).mark_circle(size=60).encode(**encodings)
-        elif chart_type == "histogram":
-            base = alt.Chart(df).mark_bar().encode(**encodings)
-        else:
+        if chart_type not in CHART_TYPES:
             st.error("❌ Unsupported chart type")
             return
 
+        fit = None
         if show_trendline:
-            trend = alt.Chart(df).transform_regression(
-                'X_Num', y_col
-            ).mark_line(color='red', strokeWidth=1.5, strokeDash=[5, 2]).encode(
-                x=alt.X('X_Num:Q', axis=None),
-                y=alt.Y(f'{y_col}:Q')
-            )
-            final_chart = (base + trend).properties(width=800, height=300)
-        else:
-            final_chart = base.properties(width=800, height=300)
-
-        st.altair_chart(final_chart, use_container_width=True)
+            try:
+                fit = fit_trendline(
+                    df['X_Num'].to_numpy(dtype=float, na_value=np.nan),
+                    df[y_col].to_numpy(dtype=float, na_value=np.nan)
+                )
+            except np.linalg.LinAlgError:
+                st.warning("⚠️ Regression failed: numerical issue (SVD did not converge).")
+
+        with perf_stage(f"chart: {y_col} ({chart_type})", rows=len(df)):
+            st.vega_lite_chart(metric_chart_spec(df, x_col, y_col, title, chart_type, x_order, fit),
+                               use_container_width=True)
 
         # 🧮 Show regression formula only if trendline is on
-        if show_trendline:
-            x = df['X_Num'].values
-            y = df[y_col].values
-
-            if len(df) > 1 and not np.isnan(x).any() and not np.isnan(y).any():
-                try:
-                    a, b = np.polyfit(x, y, deg=1)
-                    st.markdown(f"**Regression Line Equation:**  \n`y = {a:.2f}x + {b:.2f}`")
-                except np.linalg.LinAlgError:
-                    st.warning("⚠️ Regression failed: numerical issue (SVD did not converge).")
-            else:
-                st.info("Not enough clean data points to calculate regression equation.")
+        if fit is not None:
+            st.markdown(f"**Regression Line Equation:**  \n`y = {fit['slope']:.2f}x + {fit['intercept']:.2f}`")
+        elif show_trendline:
+            st.info("Not enough clean data points to calculate regression equation.")
 
         st.markdown("---")
 
+@st.fragment
+@perf_fragment('summary table')
 def plot_summary_table(df, x_col):
     st.subheader("📌 Summary Table")
     summary_df = df.rename(columns={
@@ -98,41 +146,102 @@ def plot_summary_table(df, x_col):
     })
     st.dataframe(summary_df)
 
-def plot_individual_scatter(df):
-    # 🔵 Plot base scatter chart
-    base = alt.Chart(df).mark_circle(size=60, opacity=0.6).encode(
+# Points sent to the browser per scatter plot (Altair's default row limit is 5,000)
+MAX_SCATTER_POINTS = 4000
+
+def downsample_scatter(df, max_points=MAX_SCATTER_POINTS, seed=0):
+    """Sample at most about ``max_points`` rows, stratified by closing month.
+
+    Each month keeps a share of the budget proportional to its closings (at
+    least a few rows, so quiet months stay visible). Sold_Price outliers
+    (outside 1.5 IQR of their month) are kept first, most extreme first, up to
+    half of the budget.
+    """
+    if len(df) <= max_points:
+        return df
+
+    month = df['Closed_Date'].to_numpy().astype('datetime64[M]')
+    month_codes, months = pd.factorize(month)
+    price = df['Sold_Price'].to_numpy(dtype=float, na_value=np.nan)
+
+    by_month = pd.Series(price).groupby(month_codes)
+    q1 = by_month.quantile(0.25).to_numpy()[month_codes]
+    q3 = by_month.quantile(0.75).to_numpy()[month_codes]
+    iqr = q3 - q1
+    # Distance outside the 1.5 IQR fences, in IQRs; > 0 marks an outlier
+    excess = np.fmax(q1 - 1.5 * iqr - price, price - q3 - 1.5 * iqr) / np.where(iqr > 0, iqr, 1)
+    outlier = np.zeros(len(df), dtype=bool)
+    candidates = np.flatnonzero(excess > 0)
+    outlier[candidates[np.argsort(-excess[candidates], kind='stable')[:max_points // 2]]] = True
+
+    month_sizes = np.bincount(month_codes, minlength=len(months))
+    budget = max(max_points - int(outlier.sum()), len(months))
+    quotas = np.maximum(np.floor(budget * month_sizes / len(df)), 3).astype(np.int64)
+
+    # Random order within each month, then keep the first ``quota`` rows of each
+    order = np.lexsort((np.random.default_rng(seed).random(len(df)), month_codes))
+    rank = np.arange(len(df)) - np.repeat(np.cumsum(month_sizes) - month_sizes, month_sizes)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[order] = rank < quotas[month_codes[order]]
+
+    return df[keep | outlier]
+
+def individual_scatter_chart(df):
+    """Scatter of closings with its trend line; ``df`` must have no missing Closed_Date.
+
+    Returns the chart, the trendline fit (or None), the first closing day the
+    fit's x-axis counts from, and the rows actually plotted.
+    """
+    # 🧠 Regression on the full data: use days since min date as x-axis
+    closed_day = df['Closed_Date'].dt.normalize()
+    min_day = closed_day.min()
+    days_since_min = (closed_day - min_day).dt.days
+
+    fit = fit_trendline(
+        days_since_min.to_numpy(dtype=float, na_value=np.nan),
+        df['Sold_Price'].to_numpy(dtype=float, na_value=np.nan)
+    )
+
+    # 🔵 Plot base scatter chart from a bounded sample of the rows
+    points = downsample_scatter(df)
+    base = alt.Chart(points).mark_circle(size=60, opacity=0.6).encode(
         x=alt.X('Closed_Date:T', title="Closed Date"),
         y=alt.Y('Sold_Price:Q', title="Sold Price"),
         tooltip=['MLS_Number', 'Sold_Price', 'Contract_Date', 'Status']
     )
 
-    # 🔴 Altair regression trend line (visual only)
-    trend = alt.Chart(df).transform_regression(
-        'Closed_Date', 'Sold_Price'
-    ).mark_line(color='red').encode(
-        x='Closed_Date:T',
-        y='Sold_Price:Q'
-    )
-
-    chart = (base + trend).properties(
-        width=800,
-        height=400
-    )
-
-    st.altair_chart(chart, use_container_width=True)
-
-    # 🧠 Regression: Use days since min date as x-axis
-    df['Closed_Day'] = df['Closed_Date'].dt.date
-    min_day = df['Closed_Day'].min()
-    df['Days_Since_Min'] = (pd.to_datetime(df['Closed_Day']) - pd.to_datetime(min_day)).dt.days
+    # 🔴 Regression trend line drawn from its two endpoints
+    if fit is not None:
+        trend = alt.Chart(pd.DataFrame({
+            'Closed_Date': min_day + pd.to_timedelta(fit['x'], unit='D'),
+            'Sold_Price': fit['y']
+        })).mark_line(color='red').encode(
+            x='Closed_Date:T',
+            y='Sold_Price:Q'
+        )
+        chart = base + trend
+    else:
+        chart = base
 
-    x = df['Days_Since_Min'].values
-    y = df['Sold_Price'].values
+    return chart.properties(width=800, height=400), fit, min_day, points
 
-    if len(x) > 1:
-        a, b = np.polyfit(x, y, deg=1)
+@st.fragment
+@perf_fragment('scatter')
+def plot_individual_scatter(df):
+    df = df[df['Closed_Date'].notna()]
+    with perf_stage('scatter: fit + downsample', rows=len(df)):
+        chart, fit, min_day, points = individual_scatter_chart(df)
+
+    with perf_stage('chart: scatter', rows=len(points)):
+        st.altair_chart(chart, use_container_width=True)
+    if len(points) < len(df):
+        st.caption(f"↳ Showing a sample of {len(points):,} of {len(df):,} closings "
+                   f"(stratified by month, outliers kept). The trend line uses all closings.")
+
+    if fit is not None:
+        a, b = fit['slope'], fit['intercept']
         st.markdown(f"**Regression Line Equation:**  \n`y = {a:.2f} * days_since_start + {b:.2f}`")
-        st.caption(f"↳ Based on days since {min_day}, unit: dollars/day")
+        st.caption(f"↳ Based on days since {min_day.date()}, unit: dollars/day")
 
         # ✅ Add intuitive interpretation of slope
         if abs(a) >= 1:
@@ -148,8 +257,8 @@ def plot_individual_scatter(df):
                 unsafe_allow_html=True
             )
 
-def plot_combo_chart_with_table(df, x_col, x_order=None):
-    df = df.copy()  # Work on a copy of the DataFrame
+def combo_chart(df, x_col, x_order=None):
+    """Median price line over grouped Count / Median_Days bars, one group per period."""
 
     # 1️⃣ Transform Count & Median_Days into long format for grouped bars
     bar_df = df[[x_col, 'Count', 'Median_Days']].copy()
@@ -213,9 +322,14 @@ def plot_combo_chart_with_table(df, x_col, x_order=None):
     ).resolve_scale(
         y='independent'
     ).properties(width=800, height=400)
+    return chart
 
+@st.fragment
+@perf_fragment('combo chart')
+def plot_combo_chart_with_table(df, x_col, x_order=None):
     # 7️⃣ Show chart
-    st.altair_chart(chart, use_container_width=True)
+    with perf_stage('chart: combo', rows=len(df)):
+        st.altair_chart(combo_chart(df, x_col, x_order), use_container_width=True)
 
     # 8️⃣ Transposed table
     table_df = df[[x_col, 'Median_Price', 'Count', 'Median_Days']].copy()
@@ -226,3 +340,39 @@ def plot_combo_chart_with_table(df, x_col, x_order=None):
     #  9️⃣ Custom legend (below the chart)
     st.markdown("🟧 **Orange Bar = Count**  🟩 **Green Bar = Median Days on Market**  🔵 **Blue Line = Median Sale Price**")
 
+
+ED_SWEEP_METRICS = {
+    'Closed_12M_Median_Price': "12-Month Median Sale $",
+    'Closed_12M_Median_Days': "12-Month Median Days on Market",
+    'Closed_12M_Count': "12-Month Closed Sales",
+    'Contingent_Pending_Count': "Contingent / Pending Listings",
+    'Absorption_Rate': "Absorption Rate (/month)",
+    'Absorption_Period': "Absorption Period (months)",
+    'List_To_Sale_Ratio': "List-to-Sale Ratio (%)"
+}
+
+@st.fragment
+@perf_fragment('ed sweep')
+def plot_ed_sweep(summary, quarterly):
+    st.subheader("📈 Trend Across Effective Dates")
+    metric = st.selectbox("Metric", list(ED_SWEEP_METRICS), format_func=ED_SWEEP_METRICS.get)
+    with perf_stage('chart: ed sweep', rows=len(summary)):
+        chart = alt.Chart(summary).mark_line(point=True).encode(
+            x=alt.X('ED:T', title="Effective Date"),
+            y=alt.Y(f'{metric}:Q', title=ED_SWEEP_METRICS[metric], scale=alt.Scale(zero=False)),
+            tooltip=[alt.Tooltip('ED:T'), alt.Tooltip(f'{metric}:Q', format=",.2f")]
+        ).properties(height=400)
+        st.altair_chart(chart, use_container_width=True)
+
+    st.subheader("📌 Comparison Table")
+    table_df = summary.assign(ED=summary['ED'].dt.strftime('%Y-%m-%d')).set_index('ED')
+    st.dataframe(table_df.style.format('{:,.2f}', subset=[
+        'Closed_12M_Median_Price', 'Closed_12M_Median_Days', 'Absorption_Rate', 'Absorption_Period',
+        'Median_List', 'Median_Sold', 'List_To_Sale_Ratio'
+    ]), use_container_width=True)
+
+    st.subheader("📊 Quarterly Median Sale $ by ED")
+    pivot = quarterly.assign(ED=quarterly['ED'].dt.strftime('%Y-%m-%d')).pivot(
+        index='ED', columns='Quarter', values='Median_Price'
+    )[quarterly['Quarter'].unique()]
+    st.dataframe(pivot.style.format('{:,.0f}', na_rep='–'), use_container_width=True)
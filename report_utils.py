@@ -0,0 +1,350 @@
+# report_utils.py
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from clean_utils import DEFAULT_DEDUP_RULE, STATUS_LABELS, clean_data
+from cube_utils import MonthlyCube
+from ingest_utils import CLEAN_COLUMNS, column_mismatch_message, read_excel_file
+from shared_utils import DatasetView
+from store_utils import DATASET_SUFFIX, load_dataset, sanitize_dataset_name
+from window_utils import calendar_bounds, closed_date_window, sort_by_closed_date, summarize_windows, window_bounds
+
+OPEN_STATUSES = ['Active', 'Contingent', 'Pending']
+REPORT_FORMATS = ('csv', 'json')
+
+
+def format_12_month_summary(closed_count, median_time, median_price):
+    median_time = int(median_time) if closed_count and pd.notna(median_time) else 0
+    median_price = int(median_price) if closed_count and pd.notna(median_price) else 0
+
+    summary = (
+        f"<span style='color:red; font-weight:bold'>{closed_count}</span> closed sales with a median market time of "
+        f"<span style='color:red; font-weight:bold'>{median_time}</span> days and median sales price of "
+        f"<span style='color:red; font-weight:bold'>${median_price:,.0f}</span>."
+    )
+    return summary
+
+def listing_figures(df_all, ed_date, closed_cube=None):
+    """Listing counts, absorption and list-to-sale figures for the 12 months up to the ED."""
+    one_year_ago = pd.Timestamp(ed_date) - pd.DateOffset(months=12)
+
+    # Count all active listings (no date filtering)
+    active_count = df_all[df_all['Mapped_Status'] == 'Active'].shape[0]
+
+    recent_df = df_all[df_all['Contract_Date'] >= one_year_ago]
+    cont_pend_count = recent_df[recent_df['Mapped_Status'].isin(['Contingent', 'Pending'])].shape[0]
+    if closed_cube is not None:
+        closed_stats = closed_cube.query(start=one_year_ago)
+        closed_count = closed_stats['Count']
+        median_list = closed_stats['Median_List']
+        median_sold = closed_stats['Median_Price']
+    else:
+        closed_df = closed_date_window(df_all, start=one_year_ago)
+        closed_df = closed_df[closed_df['Mapped_Status'] == 'Closed']
+        closed_count = closed_df.shape[0]
+        median_list = closed_df['List_Price'].median()
+        median_sold = closed_df['Sold_Price'].median()
+
+    months = 12
+    absorption_rate = closed_count / months if months > 0 else 0
+    absorption_period = active_count / absorption_rate if absorption_rate > 0 else float('inf')
+
+    # 🧮 List/Sold Price Ratio
+    ratio = (median_sold / median_list) * 100 if median_list else 0
+
+    return {
+        'Active_Count': active_count,
+        'Contingent_Pending_Count': cont_pend_count,
+        'Closed_Count': closed_count,
+        'Absorption_Rate': absorption_rate,
+        'Absorption_Period': absorption_period,
+        'Median_List': median_list,
+        'Median_Sold': median_sold,
+        'List_To_Sale_Ratio': ratio
+    }
+
+def generate_listing_summary(df_all, ed_date, closed_cube=None):
+    figures = listing_figures(df_all, ed_date, closed_cube)
+
+    # Create message (with ratio directly appended)
+    listing_summary = (
+        f"There are currently <span style='color:red; font-weight:bold'>{figures['Active_Count']}</span> active listings and "
+        f"<span style='color:red; font-weight:bold'>{figures['Contingent_Pending_Count']}</span> contingent/pending listings in the search parameter defined above.  \n"
+        f"🧮 Absorption Rate is <span style='color:red; font-weight:bold'>{figures['Absorption_Rate']:.2f}</span> /month, and the current inventory would be absorbed in "
+        f"<span style='color:red; font-weight:bold'>{figures['Absorption_Period']:.2f} months</span>.  \n"
+        f"The median list price was <span style='color:red; font-weight:bold'>&#36;{figures['Median_List']:,.0f}</span> and "
+        f"the median sales price was <span style='color:red; font-weight:bold'>&#36;{figures['Median_Sold']:,.0f}</span>, resulting in a "
+        f"median list-to-sale price ratio of <span style='color:red; font-weight:bold'>{figures['List_To_Sale_Ratio']:.2f}%</span>."
+    )
+
+    return listing_summary
+
+
+def build_cubes(df, statuses=STATUS_LABELS):
+    """Monthly cubes over all filtered rows and over the closed ones, as the pages use them."""
+    view = DatasetView(df).with_statuses(statuses)
+    return MonthlyCube(view.frame()), MonthlyCube(view.with_statuses(['Closed']).frame())
+
+
+def statistics_summary(all_cube, closed_cube, ed_date, count=5):
+    # The Statistics page's 12-month windows: all statuses plus the closed-only figures
+    bounds = window_bounds(ed_date, 'yearly', count)
+    windows = bounds.frame(labels=False)
+    summary = all_cube.summarize_windows(windows)
+    closed = closed_cube.summarize_windows(windows)
+    summary['Period'] = bounds.labels
+    summary['Closed_Count'] = closed['Count']
+    summary['Closed_Median_Price'] = closed['Median_Price']
+    summary['Closed_Median_Days'] = closed['Median_Days']
+    return summary
+
+
+def yearly_summary(closed_cube, ed_date, count=5):
+    """Closed sales per 12-month window before the ED, oldest first, empty windows dropped."""
+    summary = closed_cube.summarize_windows(window_bounds(ed_date, 'yearly', count).frame())
+    summary = summary[summary['Count'] > 0].sort_index(ascending=False)
+    return pd.DataFrame({
+        "Period": summary['Label'].to_numpy(),
+        "Date_Range": [f"{start.date()} to {end.date()}" for start, end in zip(summary['Start_Date'], summary['End_Date'])],
+        "Median_Price": summary['Median_Price'].to_numpy(),
+        "Median_Days": summary['Median_Days'].to_numpy(),
+        "Count": summary['Count'].to_numpy()
+    })
+
+
+def quarterly_summary(all_cube, ed_date, count=20):
+    """3-month windows Q1 (most recent) to Q``count``, oldest first, empty quarters dropped."""
+    stats = all_cube.summarize_windows(window_bounds(ed_date, 'quarterly', count).frame(labels=False))
+    stats = stats[stats['Count'] > 0].sort_index(ascending=False)
+    return pd.DataFrame({
+        "Quarter": [f"Q{i+1}" for i in stats.index],
+        "Median_Price": stats['Median_Price'].to_numpy(),
+        "Median_Days": stats['Median_Days'].to_numpy(),
+        "Count": stats['Count'].to_numpy(dtype=int),
+        "Date_Range": [f"{start.date()} to {end.date()}" for start, end in zip(stats['Start_Date'], stats['End_Date'])]
+    })
+
+
+def monthly_summary(df, start_ed, end_ed):
+    """Per-month medians and counts from ``start_ed`` to ``end_ed``; months without sales are dropped.
+
+    Returns the summary and the full list of month labels in the range.
+    """
+    bounds = calendar_bounds(start_ed, end_ed, 'monthly')
+    stats = summarize_windows(df, bounds.frame(labels=False), count_of='Sold_Price')
+    summary = pd.DataFrame({
+        'Closed_Month': bounds.labels,
+        'Median_Price': stats['Median_Price'].to_numpy(),
+        'Median_Days': stats['Median_Days'].to_numpy(),
+        'Count': stats['Count'].to_numpy()
+    })
+    return summary.dropna(subset=["Median_Price"]), bounds.labels.tolist()
+
+
+def ed_sweep(view, ed_dates, all_cube, closed_cube, quarters=20):
+    """12-month, listing/absorption and quarterly figures for many EDs in one pass.
+
+    ``view`` holds the status-filtered rows the cubes were built from. Each
+    figure's windows for all EDs go to the cube in one ``summarize_windows``
+    call (a single query on DuckDB; the pandas cubes answer them window by
+    window from their month runs), and the open listings are counted per ED
+    by binary search over their sorted contract dates, so no rows are
+    rescanned per ED. Returns one row per ED, plus the quarterly
+    medians in long form (ED, Quarter, Start_Date, End_Date, medians, Count);
+    empty quarters are kept with a Count of 0.
+    """
+    eds = pd.DatetimeIndex(sorted({pd.Timestamp(ed).normalize() for ed in ed_dates}))
+
+    # Statistics headline: closings in the 12 months up to each ED
+    twelve = closed_cube.summarize_windows(
+        pd.concat([window_bounds(ed, 'yearly', 1).frame(labels=False) for ed in eds], ignore_index=True)
+    )
+    starts = pd.DatetimeIndex(twelve['Start_Date'])
+
+    # Listing figures, as in listing_figures: closings since ED - 12 months (open-ended)
+    closed_since = closed_cube.summarize_windows(pd.DataFrame({'Start_Date': starts, 'End_Date': None}),
+                                                 columns=['Count', 'Median_List', 'Median_Price'])
+    closed_count = closed_since['Count'].to_numpy(dtype=int)
+    median_list = closed_since['Median_List'].to_numpy(dtype=float)
+    median_sold = closed_since['Median_Price'].to_numpy(dtype=float)
+
+    active_count = len(view.with_statuses(['Active']))
+    contract = view.with_statuses(['Contingent', 'Pending']).frame(['Contract_Date'])['Contract_Date'].to_numpy()
+    contract = np.sort(contract[~np.isnat(contract)])
+    cont_pend_count = len(contract) - np.searchsorted(contract, starts.to_numpy(dtype=contract.dtype), side='left')
+
+    absorption_rate = closed_count / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        absorption_period = np.where(absorption_rate > 0, active_count / absorption_rate, np.inf)
+        ratio = np.where(median_list > 0, median_sold / median_list * 100, 0.0)
+
+    summary = pd.DataFrame({
+        'ED': eds,
+        'Closed_12M_Count': twelve['Count'].to_numpy(),
+        'Closed_12M_Median_Price': twelve['Median_Price'].to_numpy(dtype=float),
+        'Closed_12M_Median_Days': twelve['Median_Days'].to_numpy(dtype=float),
+        'Active_Count': active_count,
+        'Contingent_Pending_Count': cont_pend_count,
+        'Closed_Count': closed_count,
+        'Absorption_Rate': absorption_rate,
+        'Absorption_Period': absorption_period,
+        'Median_List': median_list,
+        'Median_Sold': median_sold,
+        'List_To_Sale_Ratio': ratio
+    })
+
+    # Quarterly medians: every ED's rolling quarters in a single summarize_windows call
+    windows = pd.concat([window_bounds(ed, 'quarterly', quarters).frame(labels=False) for ed in eds], ignore_index=True)
+    stats = all_cube.summarize_windows(windows)
+    quarterly = pd.DataFrame({
+        'ED': np.repeat(eds, quarters),
+        'Quarter': [f"Q{i+1}" for i in range(quarters)] * len(eds),
+        'Start_Date': windows['Start_Date'],
+        'End_Date': windows['End_Date'],
+        'Median_Price': stats['Median_Price'].to_numpy(dtype=float),
+        'Median_Days': stats['Median_Days'].to_numpy(dtype=float),
+        'Count': stats['Count'].to_numpy(dtype=int)
+    })
+    return summary, quarterly
+
+
+def report_month_range(ed_date):
+    # The Monthly Analysis page's default range: the 13 calendar months up to the ED
+    ed = pd.Timestamp(ed_date).normalize()
+    return (ed - pd.DateOffset(months=12)).to_period('M').to_timestamp(), ed + pd.offsets.MonthEnd(0)
+
+
+def market_report(df, ed_date, statuses=STATUS_LABELS, cubes=None):
+    """Every dashboard summary for one dataset and ED, as a dict of frames.
+
+    The Monthly section covers the last 13 months up to the ED, like the
+    Monthly Analysis page's default range.
+    """
+    all_cube, closed_cube = cubes or build_cubes(df, statuses)
+    ed = pd.Timestamp(ed_date).normalize()
+    view = DatasetView(df).with_statuses(statuses)
+
+    month_start, month_end = report_month_range(ed)
+    monthly, _ = monthly_summary(view.window(month_start, month_end).frame(), month_start, month_end)
+    listing = listing_figures(view.with_statuses(OPEN_STATUSES).frame(), ed, closed_cube)
+
+    return {
+        'statistics': statistics_summary(all_cube, closed_cube, ed),
+        'yearly': yearly_summary(closed_cube, ed),
+        'quarterly': quarterly_summary(all_cube, ed),
+        'monthly': monthly,
+        'listing': pd.DataFrame([listing])
+    }
+
+
+def load_market(paths, dedup_rule=DEFAULT_DEDUP_RULE):
+    """Read and clean the data files of one market (.xlsx exports or saved .arrow datasets).
+
+    Returns the cleaned frame, the number of exact duplicate rows removed and
+    the MLS # conflict report, as ``clean_data`` does. A single saved dataset
+    was cleaned when it was saved, so it reports neither.
+    """
+    frames = []
+    for path in paths:
+        if path.endswith(DATASET_SUFFIX):
+            store_dir, file_name = os.path.split(path)
+            frames.append(load_dataset(file_name[:-len(DATASET_SUFFIX)], store_dir or '.'))
+            continue
+        with open(path, 'rb') as f:
+            df_raw = read_excel_file(f.read())
+        if df_raw is None:
+            raise ValueError(column_mismatch_message(path))
+        frames.append(df_raw.set_axis(CLEAN_COLUMNS, axis=1))
+
+    # Saved datasets are already cleaned; anything combined is cleaned together
+    if len(paths) == 1 and paths[0].endswith(DATASET_SUFFIX):
+        return sort_by_closed_date(frames[0]), 0, frames[0].iloc[:0].assign(Kept=pd.Series(dtype=bool))
+    return clean_data(pd.concat([frame[CLEAN_COLUMNS] for frame in frames], ignore_index=True), dedup_rule)
+
+
+def write_report(report, path_base, fmt):
+    """Write one report as ``path_base.json`` or as one CSV per section under ``path_base/``."""
+    if fmt == 'json':
+        payload = {name: json.loads(frame.to_json(orient='records', date_format='iso')) for name, frame in report.items()}
+        path = f"{path_base}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        return [path]
+
+    os.makedirs(path_base, exist_ok=True)
+    paths = []
+    for name, frame in report.items():
+        path = os.path.join(path_base, f"{name}.csv")
+        frame.to_csv(path, index=name == 'statistics')
+        paths.append(path)
+    return paths
+
+
+def run_market_jobs(market, paths, ed_dates, out_dir, fmt='csv', statuses=STATUS_LABELS, dedup_rule=DEFAULT_DEDUP_RULE,
+                    report_cleaning=True):
+    # Runs inside a worker process: load one market once, then report every ED from the same cubes.
+    # With report_cleaning (one task per market), also returns what cleaning dropped and writes the conflicts
+    df, removed_count, conflicts = load_market(paths, dedup_rule)
+    cubes = build_cubes(df, statuses)
+    written = []
+    cleaning = None
+    if report_cleaning:
+        cleaning = {'removed': removed_count, 'conflicts': len(conflicts), 'groups': conflicts['MLS_Number'].nunique(),
+                    'dropped': int((~conflicts['Kept']).sum()), 'path': None}
+        if len(conflicts):
+            cleaning['path'] = os.path.join(out_dir, f"{sanitize_dataset_name(market)}_conflicts.csv")
+            conflicts.to_csv(cleaning['path'], index=False)
+            written.append(cleaning['path'])
+    for ed_date in ed_dates:
+        ed = pd.Timestamp(ed_date)
+        report = market_report(df, ed, statuses, cubes)
+        path_base = os.path.join(out_dir, f"{sanitize_dataset_name(market)}_{ed.strftime('%Y-%m-%d')}")
+        written.extend(write_report(report, path_base, fmt))
+    return written, cleaning
+
+
+def run_batch(markets, ed_dates, out_dir, fmt='csv', statuses=STATUS_LABELS,
+              dedup_rule=DEFAULT_DEDUP_RULE, max_workers=None):
+    """Report every (market, ED) pair across a process pool.
+
+    ``markets`` maps a market name to its data files and ``ed_dates`` is either
+    one list of EDs for all markets or a dict of per-market lists. Each task
+    loads a market once and handles a chunk of its EDs. Yields
+    ``(market, ed_dates, written_paths, cleaning, error)`` as tasks finish;
+    ``cleaning`` counts the duplicates and MLS # conflicts dropped while
+    loading the market (once per market, else None), and the conflicting
+    records are written to ``<out_dir>/<market>_conflicts.csv``.
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"❌ Unsupported report format: '{fmt}'.")
+    os.makedirs(out_dir, exist_ok=True)
+
+    market_eds = ed_dates if isinstance(ed_dates, dict) else {market: ed_dates for market in markets}
+    workers = max_workers or os.cpu_count() or 1
+    chunk = max(1, math.ceil(sum(len(eds) for eds in market_eds.values()) / workers))
+    tasks = [
+        (market, eds[i:i + chunk], i == 0)
+        for market, eds in market_eds.items()
+        for i in range(0, len(eds), chunk)
+    ]
+
+    # Spawn rather than fork, matching ingest_utils (safe under a threaded host)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)) or 1, mp_context=context) as pool:
+        futures = {
+            pool.submit(run_market_jobs, market, markets[market], eds, out_dir, fmt, statuses, dedup_rule,
+                        report_cleaning): (market, eds)
+            for market, eds, report_cleaning in tasks
+        }
+        for future in as_completed(futures):
+            market, eds = futures[future]
+            try:
+                yield market, eds, *future.result(), None
+            except Exception as e:
+                yield market, eds, [], None, f"❌ Report for `{market}` failed. Error: {e}"
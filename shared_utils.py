@@ -0,0 +1,140 @@
+# shared_utils.py
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from window_utils import closed_date_bounds
+
+
+def status_rows(status, statuses, rows=None):
+    """Positions (within ``rows``, if given) whose categorical ``status`` is in ``statuses``.
+
+    Compares the integer category codes against a small lookup table instead
+    of matching labels row by row.
+    """
+    codes = status.cat.codes.to_numpy()
+    # The extra last slot catches missing values, whose code is -1
+    allowed = np.append(status.cat.categories.isin(list(statuses)), False)
+    if rows is None:
+        return np.flatnonzero(allowed[codes])
+    return rows[allowed[codes[rows]]]
+
+
+class DatasetView:
+    """Rows of a shared dataset selected by status and Closed_Date, kept as positions.
+
+    Filters only narrow an ascending row-position array, so composing them
+    copies no column data. ``frame()`` builds a DataFrame when something is
+    actually displayed or aggregated. The base frame must be sorted by
+    Closed_Date, as cleaned datasets are.
+    """
+
+    def __init__(self, base, rows=None):
+        self.base = base
+        self.rows = np.arange(len(base)) if rows is None else rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def with_statuses(self, statuses):
+        return DatasetView(self.base, status_rows(self.base['Mapped_Status'], statuses, self.rows))
+
+    def window(self, start=None, end=None):
+        # Binary search on the base, then on the (ascending) row positions
+        lo, hi = closed_date_bounds(self.base, start, end)
+        return DatasetView(self.base, self.rows[np.searchsorted(self.rows, lo):np.searchsorted(self.rows, hi)])
+
+    def head(self, n=5):
+        return self.base.iloc[self.rows[:n]]
+
+    def frame(self, columns=None):
+        base = self.base if columns is None else self.base[columns]
+        if len(self.rows) == len(base):
+            return base.copy(deep=False)
+        return base.iloc[self.rows]
+
+
+class DatasetHandle:
+    """A session's reference to a dataset held by ``SharedDatasetStore``.
+
+    Sessions keep the handle (not the frame) in their state. The dataset stays
+    loaded while any handle to it is alive; dropping the last one releases it.
+    """
+
+    __slots__ = ('dataset_id', '_frame', '__weakref__')
+
+    def __init__(self, dataset_id, frame):
+        self.dataset_id = dataset_id
+        self._frame = frame
+
+    @property
+    def frame(self):
+        # Shallow copy: shares the column data, so it costs no memory, but
+        # columns added by a caller never show up in other sessions
+        return self._frame.copy(deep=False)
+
+    @property
+    def cache_key(self):
+        # Derived artifacts are keyed by the dataset version, never by the handle
+        return self.dataset_id
+
+    @property
+    def row_count(self):
+        return len(self._frame)
+
+    def view(self, statuses=None):
+        view = DatasetView(self._frame)
+        return view if statuses is None else view.with_statuses(statuses)
+
+    def __repr__(self):
+        return f"DatasetHandle({self.dataset_id!r}, rows={len(self._frame)})"
+
+
+class SharedDatasetStore:
+    """Process-wide, reference-counted store of cleaned datasets.
+
+    Each dataset id is loaded once, however many sessions open it. Frames are
+    shared between sessions and must be treated as read-only. Datasets no
+    session refers to anymore are kept for quick reopening, up to ``max_idle``
+    of them, oldest dropped first.
+    """
+
+    def __init__(self, max_idle=2):
+        self.max_idle = max_idle
+        self._frames = {}
+        self._refs = {}
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, dataset_id, load):
+        """Handle for ``dataset_id``, calling ``load()`` only if it isn't held yet."""
+        with self._lock:
+            frame = self._frames.get(dataset_id)
+        if frame is None:
+            frame = load()
+        with self._lock:
+            frame = self._frames.setdefault(dataset_id, frame)
+            self._refs[dataset_id] = self._refs.get(dataset_id, 0) + 1
+            self._idle.pop(dataset_id, None)
+        handle = DatasetHandle(dataset_id, frame)
+        weakref.finalize(handle, self._release, dataset_id)
+        return handle
+
+    def _release(self, dataset_id):
+        with self._lock:
+            self._refs[dataset_id] -= 1
+            if self._refs[dataset_id] > 0:
+                return
+            del self._refs[dataset_id]
+            self._idle[dataset_id] = True
+            while len(self._idle) > self.max_idle:
+                evicted, _ = self._idle.popitem(last=False)
+                self._frames.pop(evicted, None)
+
+    def __contains__(self, dataset_id):
+        return dataset_id in self._frames
+
+    def __len__(self):
+        return len(self._frames)
@@ -0,0 +1,190 @@
+# sketch_utils.py
+import numpy as np
+
+from cube_utils import ClosedSalesIndex
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+SKETCH_QUANTILES = {'P10': 0.1, 'Median': 0.5, 'P90': 0.9}
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a relative error bound (DDSketch-style).
+
+    Positive values fall into logarithmic buckets of ratio
+    gamma = (1 + a) / (1 - a), so any quantile it returns is within a fraction
+    ``a`` (the relative accuracy) of the true value. Values <= 0 go to a
+    separate zero bucket. Sketches built with the same accuracy merge by adding
+    bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"❌ Relative accuracy must be between 0 and 1, got {relative_accuracy}.")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+
+    def bucket_index(self, values):
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def bucket_value(self, index):
+        # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    @property
+    def count(self):
+        return int(self.counts.sum()) + self.zero_count
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            index = self.bucket_index(positive)
+            self.add_counts(int(index.min()), np.bincount(index - index.min()))
+        return self
+
+    def add_counts(self, offset, counts):
+        if not len(counts):
+            return
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.astype(np.int64)
+            return
+        lo = min(self.offset, offset)
+        hi = max(self.offset + len(self.counts), offset + len(counts))
+        merged = np.zeros(hi - lo, dtype=np.int64)
+        merged[self.offset - lo:self.offset - lo + len(self.counts)] += self.counts
+        merged[offset - lo:offset - lo + len(counts)] += counts
+        self.offset, self.counts = lo, merged
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("❌ Only sketches with the same relative accuracy can be merged.")
+        self.zero_count += other.zero_count
+        self.add_counts(other.offset, other.counts)
+        return self
+
+    def _value_at_rank(self, rank):
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, rank - self.zero_count, side='right'))
+        return float(self.bucket_value(self.offset + i))
+
+    def quantile(self, q):
+        # Interpolates between neighbouring ranks like pandas' median
+        n = self.count
+        if n == 0:
+            return np.nan
+        rank = q * (n - 1)
+        lower, upper = int(np.floor(rank)), int(np.ceil(rank))
+        if lower == upper:
+            return self._value_at_rank(lower)
+        weight = rank - lower
+        return (1 - weight) * self._value_at_rank(lower) + weight * self._value_at_rank(upper)
+
+
+class SketchCube(ClosedSalesIndex):
+    """Approximate counterpart of ``cube_utils.MonthlyCube``.
+
+    Holds one sketch per month and metric as rows of a bucket-count matrix,
+    with running totals over months. Full months of a window are merged by
+    subtracting two running totals; partial edge months are added row by row.
+    Counts stay exact; quantiles carry the sketch's relative error bound.
+    """
+
+    approximate = True
+    summary_columns = ['Median_Price', 'Median_Days', 'Count', 'P10_Price', 'P90_Price']
+
+    def __init__(self, df=None, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self._probe = QuantileSketch(relative_accuracy)
+        if df is None:
+            return
+        month_idx = self._index_rows(df)
+        self.prefix = {}
+        for metric, values in self.raw.items():
+            valid = ~np.isnan(values)
+            index = self._probe.bucket_index(values[valid & (values > 0)])
+            offset = int(index.min()) if len(index) else 0
+            n_buckets = int(index.max()) - offset + 2 if len(index) else 1
+            monthly = self._month_counts(values, month_idx, offset, n_buckets, self.n_months)
+            self.prefix[metric] = (offset, self._running_totals(monthly))
+
+    @property
+    def nbytes(self):
+        return super().nbytes + sum(prefix.nbytes for _, prefix in self.prefix.values())
+
+    def _bucket_columns(self, values, offset):
+        # Column 0 is the zero bucket, column c >= 1 is log bucket offset + c - 1
+        columns = np.zeros(len(values), dtype=np.int64)
+        positive = values > 0
+        columns[positive] = self._probe.bucket_index(values[positive]) - offset + 1
+        return columns
+
+    def _month_counts(self, values, month_idx, offset, n_buckets, n_months):
+        valid = ~np.isnan(values)
+        cells = month_idx[valid] * n_buckets + self._bucket_columns(values[valid], offset)
+        return np.bincount(cells, minlength=n_months * n_buckets).reshape(n_months, n_buckets)
+
+    @staticmethod
+    def _running_totals(monthly):
+        return np.vstack([np.zeros((1, monthly.shape[1]), dtype=np.int64), np.cumsum(monthly, axis=0)])
+
+    def patched(self, df, touched_months):
+        """Cube over ``df``, which differs from this cube's rows only in ``touched_months``.
+
+        Untouched months keep their bucket counts; touched months are re-bucketed.
+        Falls back to a full build if new values fall outside the bucket range.
+        """
+        cube = SketchCube(relative_accuracy=self.relative_accuracy)
+        month_idx = cube._index_rows(df)
+        shift = cube._month_shift(self)
+        touched = cube._touched_indexes(touched_months)
+        rebuild = [m for m in range(cube.n_months) if m in touched or not 0 <= m - shift < self.n_months]
+        keep = np.setdiff1d(np.arange(cube.n_months), rebuild)
+        rows = np.concatenate([np.arange(cube.month_rows[m], cube.month_rows[m + 1]) for m in rebuild] or [np.zeros(0, dtype=np.int64)])
+
+        cube.prefix = {}
+        for metric, (offset, prefix) in self.prefix.items():
+            values = cube.raw[metric][rows]
+            columns = self._bucket_columns(values[~np.isnan(values)], offset)
+            if len(columns) and (columns.min() < 0 or columns.max() >= prefix.shape[1]):
+                return SketchCube(df, self.relative_accuracy)
+
+            old_monthly = np.diff(prefix, axis=0)
+            monthly = np.zeros((cube.n_months, prefix.shape[1]), dtype=np.int64)
+            if len(keep):
+                monthly[keep] = old_monthly[keep - shift]
+            monthly += self._month_counts(values, month_idx[rows], offset, prefix.shape[1], cube.n_months)
+            cube.prefix[metric] = (offset, self._running_totals(monthly))
+        return cube
+
+    def window_sketches(self, start=None, end=None):
+        """Row count and one merged sketch per metric for ``start <= Closed_Date <= end``."""
+        lo, hi, p, q, full_months = self._window_rows(start, end)
+        sketches = {}
+        for metric, (offset, prefix) in self.prefix.items():
+            sketch = QuantileSketch(self.relative_accuracy)
+            if len(full_months):
+                totals = prefix[full_months.stop] - prefix[full_months.start]
+                sketch.zero_count = int(totals[0])
+                sketch.add_counts(offset, totals[1:])
+            sketch.add(self.raw[metric][lo:p])
+            sketch.add(self.raw[metric][q:hi])
+            sketches[metric] = sketch
+        return hi - lo, sketches
+
+    def query(self, start=None, end=None):
+        count, sketches = self.window_sketches(start, end)
+        result = {'Count': count}
+        for metric, sketch in sketches.items():
+            result[metric] = sketch.quantile(0.5)
+        price = sketches['Median_Price']
+        result['P10_Price'] = price.quantile(SKETCH_QUANTILES['P10'])
+        result['P90_Price'] = price.quantile(SKETCH_QUANTILES['P90'])
+        return result
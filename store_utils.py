@@ -0,0 +1,115 @@
+# store_utils.py
+import json
+import os
+import re
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+DATA_STORE_DIR = os.environ.get("DASHBOARD_DATA_DIR", "datasets")
+DATASET_SUFFIX = ".arrow"
+METADATA_KEY = b"dashboard"
+
+
+def dataset_path(name, store_dir=DATA_STORE_DIR):
+    return os.path.join(store_dir, f"{name}{DATASET_SUFFIX}")
+
+
+def sanitize_dataset_name(name):
+    clean = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name).strip()).strip("._")
+    if not clean:
+        raise ValueError(f"❌ Invalid dataset name: '{name}'.")
+    return clean
+
+
+def _date_bounds(series):
+    if series.notna().any():
+        return series.min().strftime("%Y-%m-%d"), series.max().strftime("%Y-%m-%d")
+    return None, None
+
+
+def save_dataset(df, name, store_dir=DATA_STORE_DIR):
+    """Write a cleaned frame as an uncompressed Arrow IPC (Feather v2) file.
+
+    Row count and date coverage go into the schema metadata so the store can be
+    listed without reading any column data.
+    """
+    name = sanitize_dataset_name(name)
+    os.makedirs(store_dir, exist_ok=True)
+
+    closed_start, closed_end = _date_bounds(df['Closed_Date'])
+    contract_start, contract_end = _date_bounds(df['Contract_Date'])
+    info = {
+        'row_count': len(df),
+        'closed_start': closed_start,
+        'closed_end': closed_end,
+        'contract_start': contract_start,
+        'contract_end': contract_end,
+        'saved_at': datetime.now().strftime("%Y-%m-%d %H:%M"),
+    }
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(info).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Uncompressed so that reads can be served straight from the memory map
+    path = dataset_path(name, store_dir)
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return name
+
+
+def read_dataset_info(path):
+    with pa.memory_map(path, "r") as source:
+        schema = pa.ipc.open_file(source).schema
+    metadata = schema.metadata or {}
+    info = json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else {}
+    info['name'] = os.path.basename(path)[:-len(DATASET_SUFFIX)]
+    info['size_mb'] = os.path.getsize(path) / 1024 ** 2
+    return info
+
+
+def list_datasets(store_dir=DATA_STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return []
+    datasets = []
+    for file_name in sorted(os.listdir(store_dir)):
+        if file_name.endswith(DATASET_SUFFIX):
+            try:
+                datasets.append(read_dataset_info(os.path.join(store_dir, file_name)))
+            except (OSError, pa.ArrowInvalid, ValueError):
+                # Skip partial or foreign files rather than hiding the whole store
+                continue
+    return datasets
+
+
+def load_dataset(name, store_dir=DATA_STORE_DIR):
+    with pa.memory_map(dataset_path(sanitize_dataset_name(name), store_dir), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def stored_dataset_id(name, store_dir=DATA_STORE_DIR):
+    # Changes whenever the file is re-saved, so derived caches don't go stale
+    stat = os.stat(dataset_path(sanitize_dataset_name(name), store_dir))
+    return f"store:{name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def stored_dataset_name(dataset_id, store_dir=DATA_STORE_DIR):
+    # The saved dataset behind a stored_dataset_id, or None if it's not stored or was re-saved since
+    if not str(dataset_id).startswith("store:"):
+        return None
+    name = dataset_id.split(":")[1]
+    try:
+        current = stored_dataset_id(name, store_dir)
+    except (OSError, ValueError):
+        return None
+    return name if current == dataset_id else None
+
+
+def stored_dataset_path(dataset_id, store_dir=DATA_STORE_DIR):
+    name = stored_dataset_name(dataset_id, store_dir)
+    return None if name is None else dataset_path(name, store_dir)
@@ -0,0 +1,119 @@
+# synthetic_utils.py
+"""Synthetic MLS exports for benchmarks and demos.
+
+Example:
+    python synthetic_utils.py --rows 200000 --out synthetic.xlsx
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from ingest_utils import EXPECTED_COLUMNS
+
+# Share of rows per mapped status, and the raw codes each status shows up as
+# (with the casing / whitespace noise real exports have)
+STATUS_MIX = {
+    'Closed': (0.62, {'CLSD': 0.55, 'S': 0.25, 'SOLD': 0.12, 'sold ': 0.05, 'SC': 0.03}),
+    'Active': (0.20, {'ACTV': 0.6, 'NEW': 0.15, 'PCHG': 0.1, 'BOMK': 0.05, 'RACT': 0.05, 'actv': 0.05}),
+    'Contingent': (0.09, {'CTGO': 0.5, 'CTGA': 0.2, 'HS': 0.1, 'SS': 0.1, 'A/I': 0.1}),
+    'Pending': (0.09, {'PEND': 0.8, 'P': 0.1, 'PND': 0.1})
+}
+
+# Re-listed MLS numbers (same listing, newer status) and exact duplicate rows,
+# as produced by overlapping exports
+RELIST_RATE = 0.01
+DUPLICATE_RATE = 0.005
+
+
+def _status_codes(rng, n_rows, status_mix):
+    codes, weights = [], []
+    for share, code_weights in status_mix.values():
+        for code, weight in code_weights.items():
+            codes.append(code)
+            weights.append(share * weight)
+    weights = np.array(weights) / np.sum(weights)
+    return np.array(codes, dtype=object)[rng.choice(len(codes), size=n_rows, p=weights)]
+
+
+def generate_mls_data(n_rows, seed=0, start='2015-01-01', end='2025-06-30', status_mix=None):
+    """Random export-shaped frame with the seven ``EXPECTED_COLUMNS``.
+
+    Contract dates follow a spring-heavy season, closings land 15–120 days
+    after contract, prices are log-normal with a yearly trend, and only closed
+    rows carry a Closed Date and Sold Price. About 1% of listings appear again
+    as closed (a newer export) and 0.5% of rows are exact duplicates.
+    """
+    rng = np.random.default_rng(seed)
+    status_mix = STATUS_MIX if status_mix is None else status_mix
+    n_unique = max(1, int(n_rows * (1 - RELIST_RATE - DUPLICATE_RATE)))
+
+    start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+    # Leave room for the longest contract-to-close gap before ``end``
+    span_days = max((end_ts - start_ts).days - 120, 1)
+    # Seasonality: more contracts in spring/summer than in winter
+    day = rng.integers(0, span_days, size=n_unique * 2)
+    day_of_year = (start_ts.dayofyear + day) % 365
+    accept = rng.random(day.size) < 0.65 + 0.35 * np.sin(np.pi * day_of_year / 365)
+    day = np.resize(day[accept], n_unique)
+    contract = start_ts.to_datetime64() + day.astype('timedelta64[D]')
+
+    status = _status_codes(rng, n_unique, status_mix)
+    closed_codes = list(status_mix['Closed'][1])
+    is_closed = np.isin(status, closed_codes)
+
+    market_time = np.minimum(rng.geometric(1 / 45, size=n_unique), 720)
+    close_gap = rng.integers(15, 121, size=n_unique).astype('timedelta64[D]')
+    closed = np.where(is_closed, contract + close_gap, np.datetime64('NaT'))
+
+    years = day / 365.25
+    list_price = np.round(rng.lognormal(np.log(450_000), 0.45, size=n_unique) * 1.04 ** years, -3)
+    sold_price = np.round(list_price * rng.normal(1.0, 0.04, size=n_unique), -2)
+
+    df = pd.DataFrame({
+        'MLS #': rng.permutation(n_unique) + 1_000_000,
+        'Contract Date': contract,
+        'Closed Date': closed,
+        'Sold Pr': pd.array(np.where(is_closed, sold_price, np.nan)).astype('Int64'),
+        'MT': market_time,
+        'Stat': status,
+        'List Price': list_price.astype(np.int64)
+    })
+
+    # Later exports show some open listings again as closed, and repeat some rows outright
+    open_rows = df[~is_closed]
+    relisted = open_rows.sample(n=min(int(n_rows * RELIST_RATE), len(open_rows)), random_state=seed + 1)
+    relisted = relisted.assign(
+        **{'Stat': closed_codes[0],
+           'Closed Date': relisted['Contract Date'] + pd.to_timedelta(rng.integers(15, 121, size=len(relisted)), unit='D'),
+           'Sold Pr': relisted['List Price']}
+    )
+    duplicates = df.sample(n=min(n_rows - n_unique - len(relisted), n_unique), random_state=seed + 2)
+    df = pd.concat([df, relisted, duplicates], ignore_index=True)
+    return df.sample(frac=1, random_state=seed + 3).reset_index(drop=True)[EXPECTED_COLUMNS]
+
+
+def write_excel(df, path):
+    # One worksheet, like an MLS export (Excel caps a sheet at 1,048,576 rows)
+    if len(df) >= 1_048_576:
+        raise ValueError(f"❌ {len(df)} rows do not fit in one Excel worksheet.")
+    df.to_excel(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic MLS export.")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='synthetic.xlsx', help=".xlsx or .csv output path")
+    args = parser.parse_args(argv)
+
+    df = generate_mls_data(args.rows, seed=args.seed)
+    if args.out.endswith('.csv'):
+        df.to_csv(args.out, index=False)
+    else:
+        write_excel(df, args.out)
+    print(f"✅ Wrote {len(df):,} rows to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# window_utils.py
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+def _to_datetime64(value, dtype):
+    # In the searched array's unit, so searchsorted doesn't cast the whole array
+    return pd.Timestamp(value).to_datetime64().astype(dtype)
+
+
+def is_sorted_by_closed_date(df):
+    dates = df['Closed_Date']
+    n_valid = int(dates.notna().sum())
+    # Valid dates must come first (NaT last) and be non-decreasing
+    return dates.iloc[n_valid:].isna().all() and dates.iloc[:n_valid].is_monotonic_increasing
+
+
+def sort_by_closed_date(df):
+    """Order rows by Closed_Date (NaT last) so date windows become slices."""
+    if is_sorted_by_closed_date(df):
+        return df
+    return df.sort_values('Closed_Date', kind='stable', na_position='last')
+
+
+def closed_date_bounds(df, start=None, end=None):
+    """Positional [lo, hi) bounds of ``start <= Closed_Date <= end``.
+
+    ``df`` must be sorted by Closed_Date (see ``sort_by_closed_date``). Either
+    bound may be None for an open-ended window.
+    """
+    dates = df['Closed_Date'].to_numpy()
+    lo = 0 if start is None else int(np.searchsorted(dates, _to_datetime64(start, dates.dtype), side='left'))
+    if end is None:
+        # NaT sorts last, so the valid dates end at the first NaT
+        hi = int(np.searchsorted(dates, dates.dtype.type('NaT'), side='left'))
+    else:
+        hi = int(np.searchsorted(dates, _to_datetime64(end, dates.dtype), side='right'))
+    return lo, max(lo, hi)
+
+
+def closed_date_window(df, start=None, end=None):
+    # Binary search on the sorted index; the result is a positional slice, not a mask
+    lo, hi = closed_date_bounds(df, start, end)
+    return df.iloc[lo:hi]
+
+
+# Named granularities as (count, unit) steps; units are days, weeks or months
+GRANULARITIES = {
+    'weekly': (1, 'W'),
+    'monthly': (1, 'M'),
+    'quarterly': (3, 'M'),
+    '6-month': (6, 'M'),
+    'yearly': (12, 'M')
+}
+_UNIT_NAMES = {'D': 'Day', 'W': 'Week', 'M': 'Month'}
+
+
+class WindowBounds(NamedTuple):
+    """Inclusive [start, end] day bounds per window, as datetime64[D] arrays."""
+    starts: np.ndarray
+    ends: np.ndarray
+    labels: np.ndarray
+
+    def frame(self, labels=True):
+        # Start_Date / End_Date (/ Label), indexed by window number, as summarize_windows takes them
+        frame = pd.DataFrame({
+            'Start_Date': self.starts.astype('datetime64[ns]'),
+            'End_Date': self.ends.astype('datetime64[ns]')
+        }, index=pd.RangeIndex(len(self.starts), name='Window'))
+        return frame.assign(Label=self.labels) if labels else frame
+
+
+def parse_granularity(granularity):
+    """``(count, unit)`` for a named granularity or a custom one such as '10D', '2W' or '4M'."""
+    if isinstance(granularity, tuple):
+        return granularity
+    if granularity in GRANULARITIES:
+        return GRANULARITIES[granularity]
+    count, unit = str(granularity)[:-1], str(granularity)[-1:].upper()
+    if unit not in _UNIT_NAMES or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"❌ Unknown granularity: '{granularity}'. Use one of {', '.join(GRANULARITIES)} "
+                         f"or a count and unit such as '10D', '2W' or '4M'.")
+    return int(count), unit
+
+
+def _shift(day, steps, count, unit):
+    # ``day`` minus ``steps * count`` units; month steps clip to the month's last day, like DateOffset
+    if unit != 'M':
+        days = count * (7 if unit == 'W' else 1)
+        return day - (steps * days).astype('timedelta64[D]')
+    months = day.astype('datetime64[M]') - steps * count
+    month_days = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+    day_of_month = (day - day.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64)
+    return months.astype('datetime64[D]') + np.minimum(day_of_month, month_days - 1).astype('timedelta64[D]')
+
+
+def _read_only(*arrays):
+    # Cached bounds are shared by every caller
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=256)
+def _rolling_bounds(ed_day, count, unit, n_windows):
+    steps = np.arange(1, n_windows + 1)
+    starts = _shift(np.full(n_windows, ed_day), steps, count, unit)
+    ends = np.concatenate(([ed_day], starts[:-1] - np.timedelta64(1, 'D')))
+    name = _UNIT_NAMES[unit]
+    labels = np.array([f"{i * count}–{(i + 1) * count} {name}" for i in range(n_windows)], dtype=object)
+    return WindowBounds(*_read_only(starts, ends, labels))
+
+
+def window_bounds(ed_date, granularity, count):
+    """``count`` back-to-back windows of one ``granularity`` ending at the ED, most recent first.
+
+    Window ``i`` runs from ED - (i+1) steps to the day before ED - i steps;
+    window 0 ends on the ED itself. Bounds are cached per (ED, granularity,
+    count), so pages and granularities asking for the same windows share them.
+    """
+    step_count, unit = parse_granularity(granularity)
+    return _rolling_bounds(np.datetime64(pd.Timestamp(ed_date).normalize(), 'D'), step_count, unit, count)
+
+
+def _calendar_label(start, count, unit):
+    start = pd.Timestamp(start)
+    if unit == 'M' and (count, unit) == GRANULARITIES['monthly']:
+        return start.strftime('%Y-%m')
+    if unit == 'M' and count == 3:
+        return f"{start.year}Q{(start.month - 1) // 3 + 1}"
+    if unit == 'M' and count == 6:
+        return f"{start.year}-H{(start.month - 1) // 6 + 1}"
+    if unit == 'M' and count == 12:
+        return str(start.year)
+    return start.strftime('%Y-%m-%d')
+
+
+@lru_cache(maxsize=256)
+def _calendar_bounds(first_day, last_day, count, unit):
+    if unit == 'M':
+        # Aligned to the year for steps dividing 12 (quarters, halves, years), else to the first month
+        first_month = first_day.astype('datetime64[M]')
+        if 12 % count == 0:
+            first_month -= (first_month.astype(np.int64) % count)
+        n_windows = (last_day.astype('datetime64[M]') - first_month).astype(np.int64) // count + 1
+        starts = (first_month + np.arange(n_windows) * count).astype('datetime64[D]')
+        next_starts = (first_month + np.arange(1, n_windows + 1) * count).astype('datetime64[D]')
+    else:
+        days = count * (7 if unit == 'W' else 1)
+        # Weeks start on Monday (1970-01-01 was a Thursday)
+        first = first_day - ((first_day.astype(np.int64) + 3) % 7 if unit == 'W' else 0)
+        n_windows = (last_day - first).astype(np.int64) // days + 1
+        starts = first + (np.arange(n_windows) * days).astype('timedelta64[D]')
+        next_starts = starts + np.timedelta64(days, 'D')
+    # The first and last windows are cut to the requested range
+    ends = np.minimum(next_starts - np.timedelta64(1, 'D'), last_day)
+    labels = np.array([_calendar_label(start, count, unit) for start in starts], dtype=object)
+    starts = np.maximum(starts, first_day)
+    return WindowBounds(*_read_only(starts, ends, labels))
+
+
+def calendar_bounds(start, end, granularity):
+    """Calendar windows (weeks from Monday, months, quarters, halves, years) covering ``start`` to ``end``, oldest first.
+
+    Windows are cut to the range at both ends and labelled like '2025-06',
+    '2025Q2', '2025-H1' or '2025' (other granularities by their first day).
+    """
+    step_count, unit = parse_granularity(granularity)
+    first_day = np.datetime64(pd.Timestamp(start).normalize(), 'D')
+    last_day = np.datetime64(pd.Timestamp(end).normalize(), 'D')
+    if last_day < first_day:
+        raise ValueError("❌ The window range ends before it starts.")
+    return _calendar_bounds(first_day, last_day, step_count, unit)
+
+
+def summarize_windows(df, windows, count_of=None):
+    """Median_Price, Median_Days and Count for every window in a single groupby.
+
+    ``df`` must be sorted by Closed_Date and ``windows`` must be contiguous (as
+    built by ``window_bounds`` or ``calendar_bounds``). Window boundaries are
+    located with one searchsorted call, rows are labelled with their window id,
+    and all windows are aggregated together. Count is the number of rows, or
+    of non-missing ``count_of`` values; empty windows get 0 and NaN medians.
+    """
+    dates = df['Closed_Date'].to_numpy()
+    ordered = windows.sort_values('Start_Date')
+    last_end = pd.Timestamp(ordered['End_Date'].iloc[-1]) + pd.Timedelta(days=1)
+    edges = np.append(ordered['Start_Date'].to_numpy(), last_end.to_datetime64()).astype(dates.dtype)
+
+    cuts = np.searchsorted(dates, edges, side='left')
+    window_ids = np.repeat(ordered.index.to_numpy(), np.diff(cuts))
+    rows = df.iloc[cuts[0]:cuts[-1]]
+
+    grouped = rows.groupby(window_ids)
+    summary = windows.copy()
+    summary['Median_Price'] = grouped['Sold_Price'].median().astype(float)
+    summary['Median_Days'] = grouped['Market_Time'].median().astype(float)
+    counts = grouped.size() if count_of is None else grouped[count_of].count()
+    summary['Count'] = counts.reindex(windows.index, fill_value=0)
+    return summary